@@ -0,0 +1,114 @@
+"""Baseline schema: users, posts, votes, comments, chat_messages
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+Databases created before migrations were checked in (create_all, or
+migrations kept outside the repo) already have these tables; for them
+this revision creates nothing and only records the baseline. Offline
+(--sql) output always includes the CREATE TABLEs.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table("users"):
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("phone_number", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_created_at", "users", ["created_at"])
+    op.create_index("ix_users_phone_number", "users", ["phone_number"], unique=True)
+
+    op.create_table(
+        "posts",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("content", sa.String(), nullable=False),
+        sa.Column("published", sa.Boolean(), server_default="true", nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_posts_id", "posts", ["id"])
+    op.create_index("ix_posts_title", "posts", ["title"])
+    op.create_index("ix_posts_created_at", "posts", ["created_at"])
+    op.create_index("ix_posts_owner_id", "posts", ["owner_id"])
+
+    op.create_table(
+        "votes",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "post_id"),
+    )
+    op.create_index("ix_votes_user_id", "votes", ["user_id"])
+    op.create_index("ix_votes_post_id", "votes", ["post_id"])
+
+    op.create_table(
+        "comments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("parent_id", sa.Integer(), nullable=True),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["parent_id"], ["comments.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_comments_id", "comments", ["id"])
+    op.create_index("ix_comments_created_at", "comments", ["created_at"])
+    op.create_index("ix_comments_post_id", "comments", ["post_id"])
+    op.create_index("ix_comments_owner_id", "comments", ["owner_id"])
+
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sender_id", sa.Integer(), nullable=False),
+        sa.Column("receiver_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["sender_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["receiver_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_chat_messages_id", "chat_messages", ["id"])
+    op.create_index("ix_chat_messages_created_at", "chat_messages", ["created_at"])
+    op.create_index("ix_chat_messages_sender_id", "chat_messages", ["sender_id"])
+    op.create_index("ix_chat_messages_receiver_id", "chat_messages", ["receiver_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("chat_messages")
+    op.drop_table("comments")
+    op.drop_table("votes")
+    op.drop_table("posts")
+    op.drop_table("users")
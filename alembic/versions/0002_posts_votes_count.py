@@ -0,0 +1,41 @@
+"""posts.votes_count, backfilled from votes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:10:00
+
+The DEFAULT fills existing rows with 0 without rewriting the table; the
+UPDATE then sets the real counts (what 'python -m app.maintenance
+reconcile-votes' does later for drift).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "posts",
+        sa.Column("votes_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE posts SET votes_count = v.n
+        FROM (SELECT post_id, count(*) AS n FROM votes GROUP BY post_id) AS v
+        WHERE posts.id = v.post_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("posts", "votes_count")
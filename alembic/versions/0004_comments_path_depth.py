@@ -0,0 +1,53 @@
+"""comments.path (COLLATE "C") and comments.depth, backfilled
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:30:00
+
+path stays nullable: the app sets it right after the INSERT (the id is
+part of it), and workers still on the old code keep inserting without it
+until they are replaced. The backfill below is the same recursive walk
+as 'python -m app.maintenance backfill-comment-paths', which picks up
+rows written during the rollout.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("comments", sa.Column("path", sa.String(collation="C"), nullable=True))
+    op.add_column("comments", sa.Column("depth", sa.Integer(), server_default="0", nullable=False))
+    op.execute(
+        """
+        WITH RECURSIVE comment_paths(id, path, depth) AS (
+            SELECT id, lpad(id::text, 10, '0'), 0
+            FROM comments WHERE parent_id IS NULL
+            UNION ALL
+            SELECT c.id, p.path || '/' || lpad(c.id::text, 10, '0'), p.depth + 1
+            FROM comments c JOIN comment_paths p ON c.parent_id = p.id
+        )
+        UPDATE comments SET path = comment_paths.path, depth = comment_paths.depth
+        FROM comment_paths
+        WHERE comments.id = comment_paths.id
+        """
+    )
+    op.create_index("ix_comments_parent_id", "comments", ["parent_id"])
+    op.create_index("ix_comments_post_id_path", "comments", ["post_id", "path"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_comments_post_id_path", table_name="comments")
+    op.drop_index("ix_comments_parent_id", table_name="comments")
+    op.drop_column("comments", "depth")
+    op.drop_column("comments", "path")
@@ -0,0 +1,30 @@
+"""(post_id, parent_id, path) index for pages of sibling comments
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 09:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_comments_post_id_parent_id_path", "comments", ["post_id", "parent_id", "path"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_comments_post_id_parent_id_path", table_name="comments")
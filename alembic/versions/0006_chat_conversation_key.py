@@ -0,0 +1,73 @@
+"""chat_messages.conversation_key and the conversation keyset index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 09:50:00
+
+Added nullable, backfilled with the same formula as
+models.conversation_key() ((low id << 32) | high id), and only then made
+NOT NULL; the index is built last, on the filled column.
+
+Workers still on the previous release insert rows without the column
+during a rolling deploy, so a BEFORE INSERT trigger computes it when it
+is missing (Postgres checks NOT NULL after BEFORE triggers). It is
+created before the backfill so no row slips through in between.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chat_messages", sa.Column("conversation_key", sa.BigInteger(), nullable=True))
+    op.execute(
+        """
+        CREATE FUNCTION chat_messages_conversation_key() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.conversation_key IS NULL THEN
+                NEW.conversation_key := (least(NEW.sender_id, NEW.receiver_id)::bigint << 32)
+                                        | greatest(NEW.sender_id, NEW.receiver_id);
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER chat_messages_conversation_key
+        BEFORE INSERT ON chat_messages
+        FOR EACH ROW EXECUTE FUNCTION chat_messages_conversation_key()
+        """
+    )
+    op.execute(
+        """
+        UPDATE chat_messages
+        SET conversation_key = (least(sender_id, receiver_id)::bigint << 32)
+                               | greatest(sender_id, receiver_id)
+        WHERE conversation_key IS NULL
+        """
+    )
+    op.alter_column("chat_messages", "conversation_key", nullable=False)
+    op.create_index(
+        "ix_chat_messages_conversation_created_id",
+        "chat_messages",
+        ["conversation_key", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_chat_messages_conversation_created_id", table_name="chat_messages")
+    op.execute("DROP TRIGGER chat_messages_conversation_key ON chat_messages")
+    op.execute("DROP FUNCTION chat_messages_conversation_key()")
+    op.drop_column("chat_messages", "conversation_key")
@@ -0,0 +1,160 @@
+# app/chat_store.py
+"""
+Write-behind persistence for chat messages.
+
+Ids come from the chat_messages sequence in blocks and timestamps are set
+on arrival, so a message can be delivered before its row exists. Rows are
+queued and written by one task per worker in multi-row INSERTs, flushed
+when CHAT_FLUSH_MAX_BATCH rows are waiting or CHAT_FLUSH_INTERVAL_MS has
+passed since the first one.
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Deque, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .config import settings
+from .database import session_scope
+
+logger = logging.getLogger("chat_store")
+
+MAX_ATTEMPTS = 3
+
+
+class IdAllocator:
+    """Hands out chat_messages ids from blocks reserved with one nextval() query."""
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self._ids: Deque[int] = deque()
+        self._lock = asyncio.Lock()
+
+    async def next_id(self) -> int:
+        if not self._ids:
+            async with self._lock:
+                if not self._ids:
+                    self._ids.extend(await self._reserve())
+        return self._ids.popleft()
+
+    async def _reserve(self) -> List[int]:
+        seq = func.pg_get_serial_sequence(models.ChatMessage.__tablename__, "id")
+        async with session_scope() as db:
+            result = await db.execute(
+                select(func.nextval(seq)).select_from(func.generate_series(1, self.block_size))
+            )
+            ids = sorted(result.scalars().all())
+            await db.commit()
+        return ids
+
+
+class ChatWriter:
+    def __init__(self):
+        self.ids = IdAllocator(settings.chat_id_block_size)
+        self._queue: "asyncio.Queue[Tuple[dict, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def new_message(self, sender_id: int, receiver_id: int, content: str) -> dict:
+        """Row for a new message, with its final id and timestamp."""
+        return {
+            "id": await self.ids.next_id(),
+            "content": content,
+            "created_at": datetime.utcnow(),
+            "sender_id": sender_id,
+            "receiver_id": receiver_id,
+            "conversation_key": models.conversation_key(sender_id, receiver_id),
+        }
+
+    def submit(self, row: dict) -> "asyncio.Future":
+        """Queue a row; the future resolves once its batch is committed."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        done = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, done))
+        return done
+
+    async def save(self, row: dict) -> None:
+        """Queue a row, waiting for the commit only under write_through."""
+        done = self.submit(row)
+        if settings.chat_durability == "write_through":
+            await done
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = settings.chat_flush_interval_ms / 1000
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + interval
+            while len(batch) < settings.chat_flush_max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[dict, "asyncio.Future"]]):
+        rows = [row for row, _ in batch]
+        error = None
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                await self._insert(rows)
+                error = None
+                break
+            except IntegrityError as e:
+                error = e  # a bad row fails the same way every time: no retry
+                break
+            except Exception as e:
+                error = e
+                logger.warning(f"Chat flush of {len(rows)} rows failed (attempt {attempt + 1}): {e}")
+                if attempt + 1 < MAX_ATTEMPTS:
+                    await asyncio.sleep(0.1 * 2 ** attempt)
+
+        if isinstance(error, IntegrityError) and len(batch) > 1:
+            # One bad row (e.g. a deleted receiver) must not sink the batch:
+            # bisect, so the good rows still go in a few INSERTs
+            middle = len(batch) // 2
+            await self._flush(batch[:middle])
+            await self._flush(batch[middle:])
+            return
+
+        for row, done in batch:
+            if done.done():
+                continue
+            if error is None:
+                done.set_result(row["id"])
+            else:
+                logger.error(f"Dropped chat message {row['id']}: {error}")
+                done.set_exception(error)
+                done.exception()  # write_behind never awaits it; mark retrieved
+
+    async def _insert(self, rows: List[dict]):
+        async with session_scope() as db:
+            await db.execute(insert(models.ChatMessage), rows)
+            await db.commit()
+
+    async def close(self):
+        """Flush everything queued so far, then stop."""
+        if self._task is None or self._task.done():
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+
+writer = ChatWriter()
+
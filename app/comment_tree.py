@@ -0,0 +1,268 @@
+# app/comment_tree.py
+"""
+Materialized-path helpers for threaded comments.
+
+comments.path holds the ids from the root down to the comment itself,
+each zero-padded to a fixed width and joined by "/":
+
+    0000000007                        top-level comment 7
+    0000000007/0000000012             reply 12 to comment 7
+    0000000007/0000000012/0000000031  reply 31 to reply 12
+
+Sorting by path gives depth-first order, and the subtree of P is the
+contiguous range P <= path < P + "0" ("0" sorts right after "/"), so
+subtree, depth-limited and ancestor queries are single index range scans
+on (post_id, path).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, cast, func, literal, select, update
+from sqlalchemy.orm import Session, aliased, joinedload
+
+from . import models, schemas
+from .pagination import encode_cursor, split_page
+
+
+SEGMENT_WIDTH = 10  # fits any positive int4 id
+SEPARATOR = "/"
+
+
+def make_path(comment_id: int, parent_path: Optional[str] = None) -> str:
+    segment = str(comment_id).zfill(SEGMENT_WIDTH)
+    return f"{parent_path}{SEPARATOR}{segment}" if parent_path else segment
+
+
+def path_ids(path: str) -> List[int]:
+    """Ids of the comment and all its ancestors, root first."""
+    return [int(segment) for segment in path.split(SEPARATOR)]
+
+
+def subtree_filter(path: str):
+    """The comment at `path` plus all its descendants, as an index range."""
+    return (models.Comment.path >= path) & (models.Comment.path < path + "0")
+
+
+def assign_path(comment: models.Comment, parent: Optional[models.Comment]) -> None:
+    """Call after flush (the id is needed); the caller commits."""
+    comment.path = make_path(comment.id, parent.path if parent else None)
+    comment.depth = parent.depth + 1 if parent else 0
+
+
+def to_response(comment: models.Comment) -> schemas.CommentResponse:
+    """Build the response from loaded columns — never touches lazy relationships."""
+    return schemas.CommentResponse(
+        id=comment.id,
+        content=comment.content,
+        created_at=comment.created_at,
+        post_id=comment.post_id,
+        owner_id=comment.owner_id,
+        parent_id=comment.parent_id,
+        depth=comment.depth,
+        owner=schemas.UserResponse.from_orm(comment.owner),
+        replies=[],
+    )
+
+
+def assemble(comments: Iterable[models.Comment]) -> schemas.CommentResponse:
+    """
+    Link path-ordered comments into a tree in one O(N) pass. The first
+    comment is the root; comments whose parent is not in the set (it was
+    cut by the per-node cap) are dropped along with their own replies.
+    """
+    comments = iter(comments)
+    first = next(comments)
+    root = to_response(first)
+    nodes: Dict[int, schemas.CommentResponse] = {first.id: root}
+    for comment in comments:
+        parent = nodes.get(comment.parent_id)
+        if parent is not None:
+            node = to_response(comment)
+            nodes[comment.id] = node
+            parent.replies.append(node)
+    return root
+
+
+def reply_counts(db: Session, comment_ids: List[int]) -> Dict[int, int]:
+    """Direct reply count per comment, from the parent_id index."""
+    if not comment_ids:
+        return {}
+    rows = db.execute(
+        select(models.Comment.parent_id, func.count())
+        .where(models.Comment.parent_id.in_(comment_ids))
+        .group_by(models.Comment.parent_id)
+    )
+    return dict(rows.all())
+
+
+def mark_truncated(db: Session, roots: List[schemas.CommentResponse]) -> None:
+    """
+    Fill replies_count on every node and give a replies_cursor to each
+    node that has more direct replies than were included.
+    """
+    nodes = []
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.replies)
+
+    counts = reply_counts(db, [n.id for n in nodes])
+    for node in nodes:
+        node.replies_count = counts.get(node.id, 0)
+        if len(node.replies) < node.replies_count:
+            last = node.replies[-1] if node.replies else None
+            node.replies_cursor = encode_cursor(last.id if last else 0)
+
+
+def load_page(
+    db: Session,
+    post_id: int,
+    parent: Optional[models.Comment],
+    after_id: int,
+    limit: int,
+    max_depth: int,
+    replies_per_node: int,
+) -> Tuple[List[schemas.CommentResponse], bool]:
+    """
+    One page of siblings (top-level comments, or the replies of `parent`)
+    after `after_id`, each with at most `replies_per_node` replies per node
+    and `max_depth` levels below it. Three queries whatever the thread size:
+    the sibling page, their capped descendants, and reply counts.
+    Returns (nodes, has_more).
+    """
+    c = models.Comment
+    parent_id = parent.id if parent else None
+    after_path = make_path(after_id, parent.path if parent else None) if after_id else ""
+
+    siblings = db.scalars(
+        thread_query(post_id)
+        .where(c.parent_id.is_(None) if parent is None else c.parent_id == parent_id)
+        .where(c.path > after_path)
+        .limit(limit + 1)
+    ).all()
+    siblings, has_more = split_page(siblings, limit)
+    if not siblings:
+        return [], False
+
+    descendants = []
+    level = siblings[0].depth
+    if max_depth > 0:
+        # Descendants inside the page's path range, ranked among their
+        # siblings; the range is one index scan on (post_id, path).
+        ranked = (
+            select(
+                c.id,
+                func.row_number().over(partition_by=c.parent_id, order_by=c.path).label("rank")
+            )
+            .where(
+                c.post_id == post_id,
+                c.path > siblings[0].path,
+                c.path < siblings[-1].path + "0",
+                c.depth > level,
+                c.depth <= level + max_depth,
+            )
+            .subquery()
+        )
+        kept = aliased(c)
+        descendants = db.scalars(
+            select(kept)
+            .join(ranked, kept.id == ranked.c.id)
+            .where(ranked.c.rank <= replies_per_node)
+            .options(joinedload(kept.owner))
+            .order_by(kept.path)
+        ).all()
+
+    # Nodes whose parent was cut are dropped along with it
+    nodes: Dict[int, schemas.CommentResponse] = {}
+    page = []
+    for comment in siblings:
+        node = to_response(comment)
+        nodes[comment.id] = node
+        page.append(node)
+    for comment in descendants:
+        parent_node = nodes.get(comment.parent_id)
+        if parent_node is not None:
+            node = to_response(comment)
+            nodes[comment.id] = node
+            parent_node.replies.append(node)
+
+    mark_truncated(db, page)
+    return page, has_more
+
+
+def thread_query(post_id: int):
+    return (
+        select(models.Comment)
+        .where(models.Comment.post_id == post_id)
+        .options(joinedload(models.Comment.owner))
+        .order_by(models.Comment.path)
+    )
+
+
+def load_with_context(
+    db: Session,
+    comment: models.Comment,
+    context: int = 0,
+    max_depth: int = 3,
+    replies_per_node: int = 5,
+) -> schemas.CommentResponse:
+    """
+    Permalink view: `context` ancestors of `comment` (just the chain,
+    not their other replies) plus its subtree, cut off `max_depth` levels
+    below it and at `replies_per_node` replies per node, ranked as in
+    load_page. Truncated nodes get a replies_cursor for the replies
+    endpoint. Two queries: the comments, and reply counts. comment.path
+    must be set (the router answers 503 for rows the backfill has not
+    reached).
+    """
+    c = models.Comment
+    ancestors = path_ids(comment.path)[:-1]
+    ancestors = ancestors[len(ancestors) - context:] if context else []
+
+    ranked = (
+        select(
+            c.id,
+            func.row_number().over(partition_by=c.parent_id, order_by=c.path).label("rank")
+        )
+        .where(
+            c.post_id == comment.post_id,
+            subtree_filter(comment.path),
+            c.depth > comment.depth,
+            c.depth <= comment.depth + max_depth,
+        )
+        .subquery()
+    )
+    kept = select(ranked.c.id).where(ranked.c.rank <= replies_per_node)
+
+    query = thread_query(comment.post_id).where(
+        c.id.in_(ancestors + [comment.id]) | c.id.in_(kept)
+    )
+    root = assemble(db.scalars(query).all())
+    mark_truncated(db, [root])
+    return root
+
+
+def backfill_paths(db: Session) -> int:
+    """
+    Fill path/depth for rows written before the column existed.
+    Returns the number of comments updated.
+    """
+    c = models.Comment
+    segment = func.lpad(cast(c.id, String), SEGMENT_WIDTH, "0")
+    tree = (
+        select(c.id, segment.label("path"), literal(0).label("depth"))
+        .where(c.parent_id.is_(None))
+        .cte("comment_paths", recursive=True)
+    )
+    tree = tree.union_all(
+        select(c.id, tree.c.path + SEPARATOR + segment, tree.c.depth + 1)
+        .join(tree, c.parent_id == tree.c.id)
+    )
+    result = db.execute(
+        update(c)
+        .where(c.id == tree.c.id, c.path.is_distinct_from(tree.c.path))
+        .values(path=tree.c.path, depth=tree.c.depth)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
@@ -1,7 +1,20 @@
 # app/config.py
 import os
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
+
+
+def _sync_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg2://", 1)
+    return url
+
+
+def _async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
 
 
 class Settings(BaseSettings):
@@ -12,8 +25,11 @@ class Settings(BaseSettings):
     database_port: str = os.getenv("DATABASE_PORT", "5432")
     database_name: str = os.getenv("DATABASE_NAME")
 
-    # JWT
+    # JWT — SECRET_KEY signs new tokens; keys listed in
+    # JWT_PREVIOUS_SECRET_KEYS (comma-separated) still verify during rotation
     secret_key: str = os.getenv("SECRET_KEY")
+    jwt_previous_secret_keys: str = os.getenv("JWT_PREVIOUS_SECRET_KEYS", "")
+    token_cache_size: int = int(os.getenv("TOKEN_CACHE_SIZE", "50000"))
 
     # Redis
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
@@ -25,20 +41,121 @@ class Settings(BaseSettings):
     env: str = os.getenv("ENV", "production")
     debug: bool = os.getenv("DEBUG", "False").lower() == "true"
 
+    # Database mode: "sync" (psycopg2 + threadpool) or "async" (asyncpg)
+    db_mode: str = os.getenv("DB_MODE", "sync")
+
+    # Connection pools (per engine, per worker)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+    # Read replicas (comma-separated URLs) for read-only routes; a user's
+    # reads stay on the primary for READ_YOUR_WRITES_SECONDS after they write
+    database_replica_url: str = os.getenv("DATABASE_REPLICA_URL", "")
+    read_your_writes_seconds: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+    # Per-route request metrics on GET /metrics (Prometheus text format),
+    # served only to "Authorization: Bearer $METRICS_TOKEN" (404 when unset);
+    # SERVER_TIMING also returns each request's breakdown in a header
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    metrics_token: str = os.getenv("METRICS_TOKEN", "")
+    server_timing: bool = os.getenv("SERVER_TIMING", "False").lower() == "true"
+
+    # Post search: "postgres" (tsvector + GIN) or "memory" (in-process index;
+    # tests and single-worker development only, refused when WEB_CONCURRENCY > 1)
+    search_backend: str = os.getenv("SEARCH_BACKEND", "postgres")
+    # Worker processes, as read by uvicorn and gunicorn
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+    # Authenticated-principal cache (per worker, optionally shared via Redis)
+    auth_cache_size: int = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+    auth_cache_ttl_seconds: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    auth_cache_redis: bool = os.getenv("AUTH_CACHE_REDIS", "False").lower() == "true"
+
+    # Password hashing: Argon2 cost and the process pool it runs in
+    argon2_time_cost: int = int(os.getenv("ARGON2_TIME_COST", "3"))
+    argon2_memory_cost: int = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+    argon2_parallelism: int = int(os.getenv("ARGON2_PARALLELISM", "4"))
+    hash_workers: int = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))  # 0 = threadpool
+    hash_max_pending: int = int(os.getenv("HASH_MAX_PENDING", "64"))
+
+    # Chat persistence: messages are written behind in batches.
+    # CHAT_DURABILITY=write_behind delivers before the row is stored;
+    # write_through waits for the batch holding the message to commit.
+    chat_durability: str = os.getenv("CHAT_DURABILITY", "write_behind")
+    chat_flush_max_batch: int = int(os.getenv("CHAT_FLUSH_MAX_BATCH", "200"))
+    chat_flush_interval_ms: int = int(os.getenv("CHAT_FLUSH_INTERVAL_MS", "50"))
+    chat_id_block_size: int = int(os.getenv("CHAT_ID_BLOCK_SIZE", "100"))
+
+    # WebSocket fan-out: per-connection outbound queue and what to do when
+    # a slow client fills it: "disconnect", "drop_oldest" or "drop_newest"
+    ws_send_queue_size: int = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+    ws_slow_consumer_policy: str = os.getenv("WS_SLOW_CONSUMER_POLICY", "disconnect")
+
+    # Chat presence: which node (worker) holds each user's sockets. NODE_ID
+    # defaults to host-pid; entries expire unless heartbeated.
+    node_id: str = os.getenv("NODE_ID", "")
+    presence_ttl_seconds: int = int(os.getenv("PRESENCE_TTL_SECONDS", "30"))
+    presence_heartbeat_seconds: int = int(os.getenv("PRESENCE_HEARTBEAT_SECONDS", "10"))
+
+    # Chat delivery log: a capped Redis stream per receiver that clients
+    # replay from on reconnect (?last_id=) and trim by acknowledging
+    chat_stream_maxlen: int = int(os.getenv("CHAT_STREAM_MAXLEN", "1000"))
+    chat_stream_ttl_seconds: int = int(os.getenv("CHAT_STREAM_TTL_SECONDS", str(7 * 24 * 3600)))
+    chat_replay_batch: int = int(os.getenv("CHAT_REPLAY_BATCH", "500"))
+
+    # Read-through Redis cache for post bodies and feed pages
+    post_cache: bool = os.getenv("POST_CACHE", "True").lower() == "true"
+    post_cache_ttl_seconds: int = int(os.getenv("POST_CACHE_TTL_SECONDS", "300"))
+    feed_cache_ttl_seconds: int = int(os.getenv("FEED_CACHE_TTL_SECONDS", "30"))
+
+    # Most ids accepted by the batch endpoints (POST /posts/batch, GET /vote/state)
+    batch_max_ids: int = int(os.getenv("BATCH_MAX_IDS", "100"))
+
+    # Vote counts: "sql" updates posts.votes_count in the vote's transaction;
+    # "redis" keeps pending deltas in Redis, flushed to Postgres in batches
+    vote_counter: str = os.getenv("VOTE_COUNTER", "sql")
+    vote_flush_interval_ms: int = int(os.getenv("VOTE_FLUSH_INTERVAL_MS", "1000"))
+    vote_flush_batch: int = int(os.getenv("VOTE_FLUSH_BATCH", "500"))
+
+    # "Hot" feed: a Redis sorted set of the top HOT_FEED_SIZE posts
+    hot_feed_size: int = int(os.getenv("HOT_FEED_SIZE", "1000"))
+
     @property
     def DATABASE_URL(self) -> str:
         """Build full PostgreSQL URL with psycopg2 driver."""
         if self.database_url:
-            url = self.database_url
-            if url.startswith("postgres://"):
-                return url.replace("postgres://", "postgresql+psycopg2://", 1)
-            return url
+            return _sync_url(self.database_url)
 
         return (
             f"postgresql+psycopg2://{self.database_username}:{self.database_password}"
             f"@{self.database_host}:{self.database_port}/{self.database_name}"
         )
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """Same database as DATABASE_URL, but on the asyncpg driver."""
+        return _async_url(self.DATABASE_URL)
+
+    @property
+    def REPLICA_URLS(self) -> List[str]:
+        return [_sync_url(u.strip()) for u in self.database_replica_url.split(",") if u.strip()]
+
+    @property
+    def ASYNC_REPLICA_URLS(self) -> List[str]:
+        return [_async_url(u) for u in self.REPLICA_URLS]
+
+    @property
+    def DB_ASYNC(self) -> bool:
+        return self.db_mode.lower() == "async"
+
+    @property
+    def JWT_SECRET_KEYS(self) -> List[str]:
+        """Active signing key first, then keys that only verify."""
+        previous = [k.strip() for k in self.jwt_previous_secret_keys.split(",") if k.strip()]
+        return [self.secret_key] + previous
+
     @property
     def REDIS_URL(self) -> str:
         """Return Redis URL (with redis:// scheme)."""
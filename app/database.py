@@ -1,18 +1,70 @@
 # app/database.py
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from .config import settings
+from . import metrics
+
+
+class PoolWaitStats:
+    """How long checkouts waited for a connection (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records the time each checkout spends waiting."""
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_stats.record(waited)
+            metrics.record_pool_wait(waited)
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options() -> dict:
+    return dict(
+        pool_pre_ping=True,        # Verify connections
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        echo=False                 # Set to True only in debug
+    )
 
 
 # Create engine using secure DATABASE_URL from .env
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,        # Verify connections
-    pool_size=5,
-    max_overflow=10,
-    echo=False                 # Set to True only in debug
-)
+engine = create_engine(settings.DATABASE_URL, poolclass=TimedQueuePool, **_pool_options())
 
 # Session factory
 SessionLocal = sessionmaker(
@@ -21,6 +73,84 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Read replicas (DATABASE_REPLICA_URL); none configured -> reads use the primary
+replica_engines = [
+    create_engine(url, poolclass=TimedQueuePool, **_pool_options())
+    for url in settings.REPLICA_URLS
+]
+_replica_sessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=e) for e in replica_engines
+]
+_next_replica = itertools.count()
+
+
+def ReplicaSessionLocal(**kw) -> Session:
+    """Session on the next replica (round robin), or on the primary."""
+    if not _replica_sessions:
+        return SessionLocal(**kw)
+    return _replica_sessions[next(_next_replica) % len(_replica_sessions)](**kw)
+
+
+# Async engine (asyncpg) — only built when DB_MODE=async
+async_engine = None
+AsyncSessionLocal = None
+async_replica_engines = []
+_async_replica_sessions = []
+
+if settings.DB_ASYNC:
+    async_engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        **_pool_options()
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+    async_replica_engines = [
+        create_async_engine(url, poolclass=TimedAsyncAdaptedQueuePool, **_pool_options())
+        for url in settings.ASYNC_REPLICA_URLS
+    ]
+    _async_replica_sessions = [
+        async_sessionmaker(e, autoflush=False, expire_on_commit=False)
+        for e in async_replica_engines
+    ]
+
+# Per-request query counts and timings (app.metrics)
+if settings.metrics_enabled:
+    for _engine in [engine, *replica_engines]:
+        metrics.instrument_engine(_engine)
+    for _engine in ([async_engine] if async_engine is not None else []) + async_replica_engines:
+        metrics.instrument_engine(_engine.sync_engine)
+
+
+def pool_stats() -> Dict[str, dict]:
+    """
+    Per-pool occupancy and checkout wait, keyed "primary", "replica0", ...
+    Exported on GET /metrics (main.py).
+    """
+    pools = {"primary": engine.pool}
+    pools.update({f"replica{i}": e.pool for i, e in enumerate(replica_engines)})
+    if async_engine is not None:
+        pools["async_primary"] = async_engine.sync_engine.pool
+        pools.update({
+            f"async_replica{i}": e.sync_engine.pool for i, e in enumerate(async_replica_engines)
+        })
+    stats = {}
+    for name, pool in pools.items():
+        wait = pool.wait_stats
+        stats[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": wait.checkouts,
+            "wait_seconds": wait.wait_seconds,
+            "max_wait_seconds": wait.max_wait_seconds,
+        }
+    return stats
+
+
 # Base class for models
 Base = declarative_base()
 
@@ -34,4 +164,106 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class ThreadpoolSession:
+    """
+    AsyncSession-compatible facade over a sync Session.
+    Each call runs in the threadpool, so `async def` routes can be
+    benchmarked against psycopg2 without a second code path.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, params=None, **kw):
+        return await run_in_threadpool(self.sync_session.execute, statement, params, **kw)
+
+    async def scalar(self, statement, params=None, **kw):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kw)
+
+    async def scalars(self, statement, params=None, **kw):
+        return await run_in_threadpool(self.sync_session.scalars, statement, params, **kw)
+
+    async def get(self, entity, ident, **kw):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kw)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, objects=None):
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def get_async_db():
+    """
+    Dependency for `async def` routes: db: AsyncSession = Depends(get_async_db)
+    DB_MODE=async -> real AsyncSession on asyncpg
+    DB_MODE=sync  -> ThreadpoolSession over psycopg2 (same API)
+
+    Relationships are never lazy-loaded in async mode — eager load
+    everything the response needs.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = ThreadpoolSession(SessionLocal(expire_on_commit=False))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# Same session outside of dependency injection (background tasks, websockets)
+session_scope = asynccontextmanager(get_async_db)
+
+
+# --- Read-only sessions: replica when configured (see app/read_routing.py) ---
+def get_replica_db():
+    db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_replica_db():
+    if _async_replica_sessions:
+        factory = _async_replica_sessions[next(_next_replica) % len(_async_replica_sessions)]
+        async with factory() as db:
+            yield db
+        return
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = ThreadpoolSession(ReplicaSessionLocal(expire_on_commit=False))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+replica_session_scope = asynccontextmanager(get_async_replica_db)
@@ -0,0 +1,36 @@
+# app/etags.py
+"""
+Conditional GET helpers. ETags come from posts.revision, so deciding on
+a 304 costs one primary-key lookup and nothing is loaded or serialized.
+"""
+from typing import Optional
+
+from fastapi import Request, Response
+
+# The representation depends on who asks (is_voted)
+VARY = "Authorization"
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(p) for p in parts) + '"'
+
+
+def matches(request: Request, etag: str) -> bool:
+    """True if If-None-Match lists etag (or is "*")."""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": VARY})
+
+
+def tag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Vary"] = VARY
@@ -0,0 +1,122 @@
+# app/hot_feed.py
+"""
+"Hot" ranking kept incrementally in the Redis sorted set posts:hot.
+
+    score = log10(max(votes_count, 1)) + (created_at - EPOCH) / 45000
+
+A post enters with its score at creation; each vote moves it by the
+change in the log term (ZADD XX INCR), so the set never needs the votes
+table. Newer posts start higher, which is the time decay. Only the top
+HOT_FEED_SIZE posts are kept. `python -m app.maintenance rebuild-hot-feed`
+recomputes the set from Postgres with the same formula.
+"""
+import logging
+import math
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import models, redis_client
+from .config import settings
+
+logger = logging.getLogger("hot_feed")
+
+HOT_KEY = "posts:hot"
+EPOCH = 1134028003  # seconds; keeps scores small
+DECAY_SECONDS = 45000  # 12.5 hours buys one order of magnitude of votes
+
+
+def _votes_term(votes_count: int) -> float:
+    return math.log10(max(votes_count, 1))
+
+
+def score(votes_count: int, created_at: datetime) -> float:
+    ts = created_at.replace(tzinfo=timezone.utc).timestamp()  # stored as naive UTC
+    return _votes_term(votes_count) + (ts - EPOCH) / DECAY_SECONDS
+
+
+def score_expr():
+    """score() in SQL, for the rebuild and the Redis-less fallback."""
+    return (
+        func.log(func.greatest(models.Post.votes_count, 1))
+        + (func.extract("epoch", models.Post.created_at) - EPOCH) / DECAY_SECONDS
+    )
+
+
+async def add(post_id: int, created_at: datetime) -> None:
+    client = redis_client.redis_client
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.zadd(HOT_KEY, {post_id: score(0, created_at)})
+        pipe.zremrangebyrank(HOT_KEY, 0, -(settings.hot_feed_size + 1))
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Hot feed add of {post_id} failed: {e}")
+
+
+async def voted(post_id: int, votes_count: int, delta: int) -> None:
+    """Move a post after its count went from votes_count - delta to votes_count."""
+    increment = _votes_term(votes_count) - _votes_term(votes_count - delta)
+    client = redis_client.redis_client
+    if client is None or not increment:
+        return
+    try:
+        # XX: posts that fell out of the top set are not re-added by a vote
+        await client.zadd(HOT_KEY, {post_id: increment}, xx=True, incr=True)
+    except Exception as e:
+        logger.warning(f"Hot feed update of {post_id} failed: {e}")
+
+
+async def remove(post_id: int) -> None:
+    client = redis_client.redis_client
+    if client is None:
+        return
+    try:
+        await client.zrem(HOT_KEY, post_id)
+    except Exception as e:
+        logger.warning(f"Hot feed remove of {post_id} failed: {e}")
+
+
+async def page(offset: int, limit: int) -> Optional[List[int]]:
+    """Post ids ranked offset..offset+limit-1, or None if Redis is unavailable."""
+    client = redis_client.redis_client
+    if client is None:
+        return None
+    try:
+        ids = await client.zrevrange(HOT_KEY, offset, offset + limit - 1)
+    except Exception as e:
+        logger.warning(f"Hot feed read failed: {e}")
+        return None
+    return [int(i) for i in ids]
+
+
+def top_stmt(offset: int, limit: int):
+    return (
+        select(models.Post.id)
+        .order_by(score_expr().desc(), models.Post.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+
+
+def rebuild(db: Session, client) -> int:
+    """Recompute posts:hot from Postgres (sync redis client); returns its size."""
+    rows = db.execute(
+        select(models.Post.id, score_expr())
+        .order_by(score_expr().desc())
+        .limit(settings.hot_feed_size)
+    ).all()
+    tmp = HOT_KEY + ":rebuild"
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(tmp)
+    if rows:
+        pipe.zadd(tmp, {post_id: float(s) for post_id, s in rows})
+        pipe.rename(tmp, HOT_KEY)  # swap in atomically
+    else:
+        pipe.delete(HOT_KEY)
+    pipe.execute()
+    return len(rows)
@@ -0,0 +1,91 @@
+# app/inbox.py
+"""
+Per-user chat delivery log on Redis Streams.
+
+Every message for a user is appended to inbox:{user_id} (capped at about
+CHAT_STREAM_MAXLEN entries) before it is routed, and carries the entry id
+as "stream_id". A client reconnecting with ?last_id= is replayed the gap
+from Redis rather than from chat_messages, and {"ack": stream_id} trims
+everything up to that id.
+"""
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+
+from . import redis_client
+from .config import settings
+
+logger = logging.getLogger("inbox")
+
+FIELD = "m"
+
+
+def inbox_key(user_id: int) -> str:
+    return f"inbox:{user_id}"
+
+
+def parse_id(stream_id: str) -> Tuple[int, int]:
+    """"1700000000000-3" -> (1700000000000, 3); ValueError if malformed."""
+    ms, _, seq = stream_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def with_stream_id(text: str, stream_id: str) -> str:
+    """Add "stream_id" to an encoded JSON object without re-encoding it."""
+    return f'{{"stream_id": "{stream_id}", {text[1:]}'
+
+
+async def append(user_id: int, text: str) -> Optional[str]:
+    """Log an encoded message for user_id; its stream id, or None without Redis."""
+    client = redis_client.redis_client
+    if client is None:
+        return None
+    key = inbox_key(user_id)
+    pipe = client.pipeline(transaction=False)
+    pipe.xadd(key, {FIELD: text}, maxlen=settings.chat_stream_maxlen, approximate=True)
+    pipe.expire(key, settings.chat_stream_ttl_seconds)
+    stream_id, _ = await pipe.execute()
+    return stream_id
+
+
+async def trimmed_past(user_id: int, last_id: str) -> Optional[str]:
+    """
+    Oldest logged id if the cap may have trimmed entries newer than
+    last_id (the stream is full and starts after it), else None.
+    """
+    client = redis_client.redis_client
+    if client is None:
+        return None
+    key = inbox_key(user_id)
+    pipe = client.pipeline(transaction=False)
+    pipe.xlen(key)
+    pipe.xrange(key, count=1)
+    length, entries = await pipe.execute()
+    if length < settings.chat_stream_maxlen or not entries:
+        return None
+    oldest = entries[0][0]
+    return oldest if parse_id(oldest) > parse_id(last_id) else None
+
+
+async def read_after(user_id: int, last_id: str) -> AsyncIterator[List[Tuple[str, str]]]:
+    """Batches of (stream_id, text) logged after last_id, oldest first."""
+    client = redis_client.redis_client
+    if client is None:
+        return
+    key = inbox_key(user_id)
+    while True:
+        entries = await client.xrange(key, min=f"({last_id}", count=settings.chat_replay_batch)
+        if not entries:
+            return
+        yield [(sid, with_stream_id(fields[FIELD], sid)) for sid, fields in entries]
+        if len(entries) < settings.chat_replay_batch:
+            return
+        last_id = entries[-1][0]
+
+
+async def ack(user_id: int, stream_id: str) -> None:
+    """Drop every entry up to and including stream_id."""
+    client = redis_client.redis_client
+    if client is None:
+        return
+    ms, seq = parse_id(stream_id)
+    await client.xtrim(inbox_key(user_id), minid=f"{ms}-{seq + 1}", approximate=False)
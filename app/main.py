@@ -1,10 +1,18 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from . import models
+import hmac
+import time
+from . import models, search, utils, realtime, vote_counter, read_routing, metrics, oauth2
+from .chat_store import writer as chat_writer
+from . import database
 from .database import engine
 from .routers import user, post, auth, vote, comment, chat  # Added comment & chat
 from .config import settings
+from .serializers import ORJSONResponse
+from .redis_client import init_redis, close_redis
 from fastapi.middleware.cors import CORSMiddleware
 
 
@@ -16,14 +24,38 @@ origins = ["*"]  # or ["https://your-frontend.com"]
 async def lifespan(app: FastAPI):
     # Optional: Auto-create tables (dev only)
     # models.Base.metadata.create_all(bind=engine)
-    print(f"API started with DB: {settings.DATABASE_URL}")
+    print(f"API started with DB: {settings.DATABASE_URL} (mode: {settings.db_mode})")
+    await run_in_threadpool(_warm_search)
+    try:
+        await init_redis()
+    except Exception:
+        pass  # logged by redis_client; Redis-backed caches fall back to the DB
     yield
+    utils.shutdown_hash_pool()
+    await realtime.manager.presence.close()
+    await realtime.manager.subscriber.close()
+    await chat_writer.close()
+    await vote_counter.counter.close()
+    await close_redis()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    for replica in database.async_replica_engines:
+        await replica.dispose()
+
+
+def _warm_search():
+    db = database.SessionLocal()
+    try:
+        search.backend.warm(db)
+    finally:
+        db.close()
 
 
 app = FastAPI(
     title="Twitter Clone API",
     version="1.0.0",
     description="Clean, modern API — no nested paths",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -36,6 +68,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def note_writes(request: Request, call_next):
+    """Keep a user's reads on the primary right after they write."""
+    response = await call_next(request)
+    if (
+        read_routing.enabled()
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        user_id = read_routing.request_user_id(request)
+        if user_id is not None:
+            await read_routing.note_write(user_id)
+    return response
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Per-route latency, DB, pool, Redis and serialization time (GET /metrics)."""
+    if not settings.metrics_enabled:
+        return await call_next(request)
+    stats = metrics.begin_request()
+    start = time.perf_counter()
+    status_code = 500  # unless call_next returns: an unhandled exception
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        metrics.end_request(
+            stats, request.method, getattr(route, "path", "unmatched"), status_code, elapsed
+        )
+    if settings.server_timing:
+        response.headers["Server-Timing"] = metrics.server_timing(stats, elapsed)
+    return response
+
+
+@app.exception_handler(utils.HashingBusy)
+async def hashing_busy_handler(request: Request, exc: utils.HashingBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in requests, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # Include routers with prefixes and tags (NO trailing slashes)
 app.include_router(post.router, tags=["posts"])
 app.include_router(user.router,  tags=["users"])
@@ -45,6 +124,73 @@ app.include_router(comment.router, prefix="", tags=["comments"])  # /posts/{post
 app.include_router(chat.router,  tags=["chat"])
 
 
+def _caches():
+    return {"claims": oauth2.claims_cache, "principals": oauth2._principals}
+
+
+def _pool_gauges():
+    return {
+        (pool, stat): stats[stat]
+        for pool, stats in database.pool_stats().items()
+        for stat in ("size", "checked_out", "overflow", "max_wait_seconds")
+    }
+
+
+def _websocket_gauges():
+    stats = realtime.manager.stats()
+    return {(stat,): stats[stat] for stat in ("users", "connections", "queued", "max_queue_depth")}
+
+
+metrics.add_collector(
+    "app_cache_hits_total", "In-process cache hits",
+    lambda: {(name,): cache.hits for name, cache in _caches().items()}, ("cache",), type="counter",
+)
+metrics.add_collector(
+    "app_cache_misses_total", "In-process cache misses",
+    lambda: {(name,): cache.misses for name, cache in _caches().items()}, ("cache",), type="counter",
+)
+metrics.add_collector(
+    "app_cache_size", "In-process cache entries",
+    lambda: {(name,): len(cache) for name, cache in _caches().items()}, ("cache",),
+)
+metrics.add_collector("db_pool", "Connection pool occupancy and worst checkout wait", _pool_gauges, ("pool", "stat"))
+metrics.add_collector(
+    "db_pool_checkouts_total", "Connection pool checkouts",
+    lambda: {(pool,): stats["checkouts"] for pool, stats in database.pool_stats().items()},
+    ("pool",), type="counter",
+)
+metrics.add_collector(
+    "db_pool_checkout_wait_seconds_total", "Time checkouts spent waiting for a connection",
+    lambda: {(pool,): stats["wait_seconds"] for pool, stats in database.pool_stats().items()},
+    ("pool",), type="counter",
+)
+metrics.add_collector("hash_pending", "Password hashes queued or running", lambda: {(): utils._pending})
+metrics.add_collector("websocket", "WebSocket connections and send queues", _websocket_gauges, ("stat",))
+metrics.add_collector(
+    "websocket_dropped_total", "Messages dropped by the slow-consumer policy",
+    lambda: {(): realtime.manager.dropped}, type="counter",
+)
+metrics.add_collector(
+    "websocket_slow_disconnects_total", "Sockets closed for being too slow",
+    lambda: {(): realtime.manager.slow_disconnects}, type="counter",
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """
+    Prometheus text exposition of app.metrics, for scrapers holding
+    METRICS_TOKEN (bearer_token in the scrape config); 404 without one set.
+    """
+    if not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "").encode()
+    if not hmac.compare_digest(supplied, f"Bearer {settings.metrics_token}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,62 @@
+# app/maintenance.py
+"""
+Operational jobs. Run from the project root, e.g. from cron:
+
+    python -m app.maintenance reconcile-votes
+    python -m app.maintenance backfill-comment-paths
+    python -m app.maintenance rebuild-hot-feed
+"""
+import argparse
+
+import redis
+
+from . import comment_tree, hot_feed, votes
+from .config import settings
+from .database import SessionLocal
+
+
+def reconcile_votes() -> None:
+    db = SessionLocal()
+    try:
+        fixed = votes.reconcile_counts(db)
+    finally:
+        db.close()
+    print(f"Reconciled votes_count on {fixed} post(s)")
+
+
+def backfill_comment_paths() -> None:
+    db = SessionLocal()
+    try:
+        filled = comment_tree.backfill_paths(db)
+    finally:
+        db.close()
+    print(f"Backfilled path on {filled} comment(s)")
+
+
+def rebuild_hot_feed() -> None:
+    db = SessionLocal()
+    client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    try:
+        size = hot_feed.rebuild(db, client)
+    finally:
+        client.close()
+        db.close()
+    print(f"Rebuilt hot feed with {size} post(s)")
+
+
+COMMANDS = {
+    "reconcile-votes": reconcile_votes,
+    "backfill-comment-paths": backfill_comment_paths,
+    "rebuild-hot-feed": rebuild_hot_feed,
+}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.maintenance")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args(argv)
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
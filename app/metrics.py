@@ -0,0 +1,216 @@
+# app/metrics.py
+"""
+Per-request performance accounting, exported in Prometheus text format.
+
+The middleware in main.py opens a RequestStats for each request. SQL
+(engine events), pool checkout waits (database.TimedQueuePool), Redis
+commands (redis_client.InstrumentedRedis) and response rendering
+(serializers.ORJSONResponse) add to it through a context variable, so
+the numbers follow the request into the threadpool. When the request
+ends they are folded into per-route-template series; GET /metrics
+renders those plus the values registered with add_collector().
+
+Deliberately dependency-free: a few counters and histograms do not need
+prometheus_client.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds", "pool_wait_seconds",
+                 "redis_commands", "redis_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.redis_commands = 0
+        self.redis_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def begin_request() -> RequestStats:
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+
+# --- Recorders (no-ops outside a request) ---
+def record_db(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += seconds
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def record_redis(commands: int, seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.redis_commands += commands
+        stats.redis_seconds += seconds
+
+
+def record_serialize(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+# --- Series ---
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), value: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, series in self._series.items():
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+ROUTE = ("method", "route")
+
+request_latency = Histogram("http_request_duration_seconds", "Request latency", ROUTE + ("status",))
+db_queries = Counter("db_queries_total", "SQL statements executed", ROUTE)
+db_seconds = Counter("db_query_seconds_total", "Time spent in SQL statements", ROUTE)
+pool_wait_seconds = Counter("db_pool_wait_seconds_total", "Time spent waiting for a pooled connection", ROUTE)
+redis_commands = Counter("redis_commands_total", "Redis commands sent (pipelined ones included)", ROUTE)
+redis_seconds = Counter("redis_seconds_total", "Time spent in Redis round trips", ROUTE)
+serialize_seconds = Counter("serialize_seconds_total", "Time spent rendering response bodies", ROUTE)
+
+_SERIES = (request_latency, db_queries, db_seconds, pool_wait_seconds,
+           redis_commands, redis_seconds, serialize_seconds)
+
+
+def end_request(stats: RequestStats, method: str, route: str, status: int, seconds: float) -> None:
+    labels = (method, route)
+    request_latency.observe(labels + (status,), seconds)
+    db_queries.inc(labels, stats.db_queries)
+    db_seconds.inc(labels, stats.db_seconds)
+    pool_wait_seconds.inc(labels, stats.pool_wait_seconds)
+    redis_commands.inc(labels, stats.redis_commands)
+    redis_seconds.inc(labels, stats.redis_seconds)
+    serialize_seconds.inc(labels, stats.serialize_seconds)
+
+
+def server_timing(stats: RequestStats, seconds: float) -> str:
+    """Server-Timing header value (durations in ms)."""
+    return ", ".join([
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.db_queries} queries"',
+        f"pool;dur={stats.pool_wait_seconds * 1000:.2f}",
+        f'redis;dur={stats.redis_seconds * 1000:.2f};desc="{stats.redis_commands} commands"',
+        f"serialize;dur={stats.serialize_seconds * 1000:.2f}",
+        f"total;dur={seconds * 1000:.2f}",
+    ])
+
+
+# --- Values read at scrape time ---
+_collectors: List[Tuple[str, str, str, Callable[[], Dict[Tuple, float]], Tuple[str, ...]]] = []
+
+
+def add_collector(name: str, help: str, collect: Callable[[], Dict[Tuple, float]],
+                  labelnames: Tuple[str, ...] = (), type: str = "gauge") -> None:
+    """
+    collect() returns {label values: value}; use {(): value} without labels.
+    type="counter" for values that only grow (name them *_total).
+    """
+    _collectors.append((name, help, type, collect, labelnames))
+
+
+def render() -> str:
+    lines: List[str] = []
+    for series in _SERIES:
+        lines += series.render()
+    for name, help, type, collect, labelnames in _collectors:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+        for labels, value in collect().items():
+            lines.append(f"{name}{_labels(labelnames, labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# --- SQLAlchemy hooks ---
+def instrument_engine(engine) -> None:
+    """Time every statement on a (sync) Engine; pass async_engine.sync_engine for asyncpg."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        record_db(time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            record_db(time.perf_counter() - conn.info["query_start"].pop())
@@ -1,6 +1,7 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Table, Text, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from .database import Base
 from datetime import datetime
 
@@ -29,8 +30,7 @@ class User(Base):
     voted_posts = relationship(
         "Post",
         secondary=votes,
-        back_populates="voted_by",
-        lazy="joined"
+        back_populates="voted_by"
     )
     comments = relationship("Comment", back_populates="owner", cascade="all, delete-orphan")
     sent_messages = relationship("ChatMessage", foreign_keys="ChatMessage.sender_id", back_populates="sender")
@@ -45,20 +45,33 @@ class Post(Base):
     content = Column(String, nullable=False)
     published = Column(Boolean, default=True, server_default="true")
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Denormalized; maintained in the same transaction as the votes row
+    votes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by edits, votes and new comments; the ETag of the post and its thread
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
 
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     owner = relationship("User", back_populates="posts")
+    # Never eager: a popular post has far more voters than we want to load
     voted_by = relationship(
         "User",
         secondary=votes,
-        back_populates="voted_posts",
-        lazy="joined"
+        back_populates="voted_posts"
     )
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
 
-    @property
-    def votes_count(self) -> int:
-        return len(self.voted_by)
+    # Full-text search document, maintained by Postgres on insert/update
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, ''))",
+            persisted=True
+        )
+    ))
+
+    __table_args__ = (
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 
 class Comment(Base):
@@ -70,24 +83,32 @@ class Comment(Base):
 
     # Foreign Keys
     post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True)
-    parent_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
 
+    # Materialized path: zero-padded ids from root to self, "/"-separated.
+    # Byte-wise ("C") collation makes a subtree one contiguous index range.
+    # Set right after the INSERT, once the id is known (see comment_tree.py).
+    path = Column(String(collation="C"), nullable=True)
+    depth = Column(Integer, nullable=False, default=0, server_default="0")  # 0 = top-level
+
     # Relationships
     post = relationship("Post", back_populates="comments")
     owner = relationship("User", back_populates="comments")
     parent = relationship("Comment", remote_side=[id], back_populates="replies")
     replies = relationship("Comment", back_populates="parent", cascade="all, delete-orphan")
 
-    @property
-    def depth(self) -> int:
-        """Calculate reply depth (0 = top-level, 1 = reply, etc.)"""
-        depth = 0
-        current = self.parent
-        while current:
-            depth += 1
-            current = current.parent
-        return depth
+    __table_args__ = (
+        Index("ix_comments_post_id_path", "post_id", "path"),
+        # Pages of siblings: top-level (parent_id IS NULL) or replies of one node
+        Index("ix_comments_post_id_parent_id_path", "post_id", "parent_id", "path"),
+    )
+
+
+def conversation_key(user_a: int, user_b: int) -> int:
+    """Same value for both directions of a DM: (low id << 32) | high id."""
+    low, high = sorted((user_a, user_b))
+    return (low << 32) | high
 
 
 class ChatMessage(Base):
@@ -99,6 +120,12 @@ class ChatMessage(Base):
 
     sender_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     receiver_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # See conversation_key(); history pages are range scans on the index below
+    conversation_key = Column(BigInteger, nullable=False)
 
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
-    receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
\ No newline at end of file
+    receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
+
+    __table_args__ = (
+        Index("ix_chat_messages_conversation_created_id", "conversation_key", "created_at", "id"),
+    )
\ No newline at end of file
@@ -1,20 +1,140 @@
 # app/oauth2.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status, WebSocket
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from typing import Optional, Union
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional
 
-from . import schemas, models, database
+from . import models, database, redis_client, utils
+from .cache import TTLCache
+from .config import settings
+
+logger = logging.getLogger("auth")
 
 # --- OAuth2 ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-# --- Config (move to config.py in production) ---
-SECRET_KEY = "your-super-secret-key-change-in-prod"  # Use .env
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# --- Config (from settings) ---
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+
+
+def _key_id(key: str) -> str:
+    """Public, stable id for a secret, carried in the token's "kid" header."""
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+SIGNING_KEY = settings.JWT_SECRET_KEYS[0]
+VERIFY_KEYS: Dict[str, str] = {_key_id(k): k for k in settings.JWT_SECRET_KEYS}
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated user as routes see it: the public profile fields
+    only, cheap to cache and to copy. Compatible with UserResponse.
+    """
+    id: int
+    email: str
+    username: str
+    phone_number: Optional[str]
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(user.id, user.email, user.username, user.phone_number, user.created_at)
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Principal":
+        data = json.loads(raw)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+_principals = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl_seconds)
+
+
+def _redis_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def _shared_cache():
+    """Redis client when AUTH_CACHE_REDIS is on and connected, else None."""
+    if settings.auth_cache_redis:
+        return redis_client.redis_client
+    return None
+
+
+async def load_principal(user_id: int, db: AsyncSession) -> Optional[Principal]:
+    """Local cache -> Redis -> database."""
+    principal = _principals.get(user_id)
+    if principal is not None:
+        return principal
+
+    shared = _shared_cache()
+    if shared is not None:
+        try:
+            raw = await shared.get(_redis_key(user_id))
+            if raw:
+                principal = Principal.from_json(raw)
+        except Exception as e:
+            logger.warning(f"Principal cache read failed: {e}")
+
+    if principal is None:
+        user = (await db.execute(
+            select(models.User).where(models.User.id == user_id)
+        )).scalars().first()
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        if shared is not None:
+            try:
+                await shared.set(_redis_key(user_id), principal.to_json(), ex=settings.auth_cache_ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Principal cache write failed: {e}")
+
+    _principals.set(user_id, principal)
+    return principal
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """Drop a user's cached principal here and in Redis."""
+    _principals.pop(user_id)
+    shared = _shared_cache()
+    if shared is not None:
+        try:
+            await shared.delete(_redis_key(user_id))
+        except Exception as e:
+            logger.warning(f"Principal cache invalidation failed: {e}")
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _user_changed(mapper, connection, target):
+    """
+    Any ORM write to a user evicts it from this worker's cache at once.
+    The Redis copy is deleted too when we are on the event loop
+    (DB_MODE=async); otherwise it ages out within AUTH_CACHE_TTL_SECONDS.
+    """
+    _principals.pop(target.id)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    utils.spawn(invalidate_principal(target.id))
 
 
 def create_access_token(data: dict) -> str:
@@ -22,47 +142,79 @@ def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(
+        to_encode, SIGNING_KEY, algorithm=ALGORITHM,
+        headers={"kid": _key_id(SIGNING_KEY)}
+    )
 
 
-def _verify_token(token: str) -> models.User:
-    """Internal: decode and validate JWT, return user."""
+# Verified claims keyed by token digest; each entry lives until the token's exp.
+# hits/misses on the cache are the counters.
+claims_cache = TTLCache(settings.token_cache_size, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def _verify_signature(token: str) -> dict:
+    """Pick the key by "kid"; tokens without one are tried against every key."""
+    kid = jwt.get_unverified_header(token).get("kid")
+    keys = [VERIFY_KEYS[kid]] if kid in VERIFY_KEYS else list(VERIFY_KEYS.values())
+    for key in keys[:-1]:
+        try:
+            return jwt.decode(token, key, algorithms=[ALGORITHM])
+        except JWTError:
+            continue
+    return jwt.decode(token, keys[-1], algorithms=[ALGORITHM])
+
+
+def token_user_id(token: str) -> Optional[int]:
+    """
+    user_id of a valid, unexpired JWT, else None. Verified claims are
+    cached until the token expires, so repeat calls cost a hash lookup
+    and never touch the database.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = claims_cache.get(digest)
+    if payload is None:
+        try:
+            payload = _verify_signature(token)
+        except JWTError:
+            return None
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            claims_cache.set(digest, payload, ttl=ttl)
+    return payload.get("user_id")
+
+
+async def _verify_token(token: str, db: AsyncSession) -> Principal:
+    """Internal: decode and validate JWT, return the cached principal."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    user_id = token_user_id(token)
+    if user_id is None:
         raise credentials_exception
 
-    # Use dependency injection for db
-    db = next(database.get_db())
-    user = db.get(models.User, user_id)
-    if user is None:
+    principal = await load_principal(user_id, db)
+    if principal is None:
         raise credentials_exception
-    return user
+    return principal
 
 
 # --- HTTP Dependency ---
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(database.get_db)
-) -> models.User:
-    """HTTP: Get current user from Bearer token."""
-    return _verify_token(token)
+    db: AsyncSession = Depends(database.get_async_db)
+) -> Principal:
+    """HTTP: Get current user from Bearer token (no DB hit when cached)."""
+    return await _verify_token(token, db)
 
 
 # --- WebSocket Dependency ---
 async def get_current_user_ws(
     websocket: WebSocket,
     token: Optional[str] = None,
-    db: Session = Depends(database.get_db)
-) -> models.User:
+) -> Principal:
     """
     WebSocket: Extract token from query param or header.
     Format: ?token=xxx or Authorization: Bearer xxx
@@ -89,19 +241,17 @@ async def get_current_user_ws(
         await websocket.close(code=4001)  # Custom code: missing token
         raise credentials_exception
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            await websocket.close(code=4001)
-            raise credentials_exception
-    except JWTError:
+    user_id = token_user_id(token)
+    if user_id is None:
         await websocket.close(code=4001)
         raise credentials_exception
 
-    user = db.get(models.User, user_id)
-    if user is None:
+    # Short-lived session: a dependency session would pin a pooled
+    # connection for the whole life of the socket
+    async with database.session_scope() as db:
+        principal = await load_principal(user_id, db)
+    if principal is None:
         await websocket.close(code=4001)
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    return principal
@@ -0,0 +1,67 @@
+# app/pagination.py
+import base64
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row into an opaque, URL-safe token."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_type(value: Any, expected: type) -> bool:
+    if isinstance(value, bool):  # JSON true/false are not ints here
+        return expected is bool
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: Optional[str], *types: type) -> Optional[Tuple[Any, ...]]:
+    """
+    Reverse of encode_cursor; 400 on anything we did not issue. `types`
+    are the expected types of the values, e.g. decode_cursor(c, float, int).
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        if not all(_is_type(v, t) for v, t in zip(values, types)):
+            raise ValueError
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return tuple(values)
+
+
+def split_page(rows: Sequence, limit: int):
+    """
+    Queries fetch limit + 1 rows; the extra row only signals another page.
+    Returns (page_rows, has_more).
+    """
+    return rows[:limit], len(rows) > limit
+
+
+def parse_ids(raw: str, max_ids: int) -> List[int]:
+    """"1,2,3" -> [1, 2, 3], duplicates dropped; 400 if malformed or too many."""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ids must be comma-separated integers"
+        )
+    if not ids or len(ids) > max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 1 and {max_ids} ids allowed"
+        )
+    return ids
@@ -0,0 +1,132 @@
+# app/post_cache.py
+"""
+Read-through Redis cache for posts.
+
+Bodies are the same for every viewer (is_voted is overlaid per request)
+and stored at post:{id}, tagged with the version held at post:{id}:v
+when they were loaded. A write bumps the version, so anything cached
+before it stops matching and is reloaded. Feed pages are cached as id
+lists tagged with feed:v, which only moves when a post is created or
+deleted. Versions are read before the database, so a reader racing a
+writer can only store an entry that is already stale.
+
+Every Redis failure is a cache miss.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from . import redis_client
+from .config import settings
+
+logger = logging.getLogger("post_cache")
+
+FEED_VERSION_KEY = "feed:v"
+VERSION_TTL_SECONDS = 24 * 3600  # must outlive any cached body
+
+
+def _client():
+    if settings.post_cache:
+        return redis_client.redis_client
+    return None
+
+
+def _post_key(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+def _version_key(post_id: int) -> str:
+    return f"post:{post_id}:v"
+
+
+def _page_key(after: Optional[int], limit: int) -> str:
+    return f"feed:{after or 0}:{limit}"
+
+
+async def get_posts(ids: List[int]) -> Tuple[Dict[int, dict], Dict[int, int]]:
+    """
+    Cached bodies for ids, plus the current version of every id that
+    missed (pass them back to put_posts).
+    """
+    client = _client()
+    if client is None or not ids:
+        return {}, {}
+    keys = []
+    for post_id in ids:
+        keys += [_version_key(post_id), _post_key(post_id)]
+    try:
+        values = await client.mget(keys)
+    except Exception as e:
+        logger.warning(f"Post cache read failed: {e}")
+        return {}, {}
+
+    hits, versions = {}, {}
+    for i, post_id in enumerate(ids):
+        version, raw = int(values[2 * i] or 0), values[2 * i + 1]
+        body = orjson.loads(raw) if raw else None
+        if body is not None and body.pop("_v") == version:
+            hits[post_id] = body
+        else:
+            versions[post_id] = version
+    return hits, versions
+
+
+async def put_posts(bodies: Dict[int, dict], versions: Dict[int, int]) -> None:
+    client = _client()
+    if client is None or not bodies:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for post_id, body in bodies.items():
+            raw = orjson.dumps({**body, "_v": versions.get(post_id, 0)})
+            pipe.set(_post_key(post_id), raw, ex=settings.post_cache_ttl_seconds)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Post cache write failed: {e}")
+
+
+async def get_feed_page(after: Optional[int], limit: int) -> Tuple[Optional[Tuple[List[int], bool]], int]:
+    """((ids, has_more) or None on a miss, current feed version)."""
+    client = _client()
+    if client is None:
+        return None, 0
+    try:
+        version, raw = await client.mget([FEED_VERSION_KEY, _page_key(after, limit)])
+    except Exception as e:
+        logger.warning(f"Feed cache read failed: {e}")
+        return None, 0
+    version = int(version or 0)
+    page = orjson.loads(raw) if raw else None
+    if page is None or page["v"] != version:
+        return None, version
+    return (page["ids"], page["more"]), version
+
+
+async def put_feed_page(after: Optional[int], limit: int, version: int, ids: List[int], has_more: bool) -> None:
+    client = _client()
+    if client is None:
+        return
+    raw = orjson.dumps({"v": version, "ids": ids, "more": has_more})
+    try:
+        await client.set(_page_key(after, limit), raw, ex=settings.feed_cache_ttl_seconds)
+    except Exception as e:
+        logger.warning(f"Feed cache write failed: {e}")
+
+
+async def invalidate(post_ids: Iterable[int] = (), feed: bool = False) -> None:
+    """Bump versions after a committed write: edits and votes pass post ids,
+    creates and deletes also pass feed=True."""
+    client = _client()
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline(transaction=False)
+        for post_id in post_ids:
+            pipe.incr(_version_key(post_id))
+            pipe.expire(_version_key(post_id), VERSION_TTL_SECONDS)
+        if feed:
+            pipe.incr(FEED_VERSION_KEY)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Post cache invalidation failed: {e}")
@@ -0,0 +1,109 @@
+# app/presence.py
+"""
+Cluster-wide chat presence.
+
+presence:{user_id} is a sorted set of the nodes holding that user's
+sockets, scored by when the entry expires. Each node re-scores its users
+every PRESENCE_HEARTBEAT_SECONDS, so a crashed node's entries lapse after
+PRESENCE_TTL_SECONDS without anyone cleaning up after it.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Callable, Iterable, List, Optional, Set
+
+from . import redis_client
+from .config import settings
+
+logger = logging.getLogger("presence")
+
+NODE_ID = settings.node_id or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def presence_key(user_id: int) -> str:
+    return f"presence:{user_id}"
+
+
+def node_channel(node_id: str) -> str:
+    return f"node:{node_id}"
+
+
+class Presence:
+    def __init__(self, local_users: Callable[[], Iterable[int]]):
+        self.local_users = local_users
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_heartbeat(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._heartbeat())
+
+    async def _mark(self, client, user_ids: Iterable[int]):
+        now = time.time()
+        expires = now + settings.presence_ttl_seconds
+        pipe = client.pipeline(transaction=False)
+        for user_id in user_ids:
+            key = presence_key(user_id)
+            pipe.zadd(key, {NODE_ID: expires})
+            pipe.zremrangebyscore(key, "-inf", now)  # lapsed nodes
+            pipe.expire(key, settings.presence_ttl_seconds)
+        await pipe.execute()
+
+    async def register(self, user_id: int):
+        """This node now holds a socket for user_id."""
+        client = redis_client.redis_client
+        if client is None:
+            return
+        self._ensure_heartbeat()
+        try:
+            await self._mark(client, [user_id])
+        except Exception as e:
+            logger.warning(f"Presence register for {user_id} failed: {e}")
+
+    async def unregister(self, user_id: int):
+        """This node's last socket for user_id is gone."""
+        client = redis_client.redis_client
+        if client is None:
+            return
+        try:
+            await client.zrem(presence_key(user_id), NODE_ID)
+        except Exception as e:
+            logger.warning(f"Presence unregister for {user_id} failed: {e}")
+
+    async def nodes(self, user_id: int) -> Set[str]:
+        """Nodes currently holding a socket for user_id (empty = offline)."""
+        client = redis_client.redis_client
+        if client is None:
+            return set()
+        members: List[str] = await client.zrangebyscore(presence_key(user_id), time.time(), "+inf")
+        return set(members)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.presence_heartbeat_seconds)
+            client = redis_client.redis_client
+            users = list(self.local_users())
+            if client is None or not users:
+                continue
+            try:
+                await self._mark(client, users)
+            except Exception as e:
+                logger.warning(f"Presence heartbeat failed: {e}")
+
+    async def close(self):
+        """Withdraw this node's entries so peers stop routing here at once."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        client = redis_client.redis_client
+        users = list(self.local_users())
+        if client is None or not users:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for user_id in users:
+                pipe.zrem(presence_key(user_id), NODE_ID)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Presence cleanup failed: {e}")
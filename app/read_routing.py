@@ -0,0 +1,87 @@
+# app/read_routing.py
+"""
+Route read-only requests to the replicas, except for a user who wrote
+in the last READ_YOUR_WRITES_SECONDS: their reads stay on the primary
+so they never see the replica's lag on their own changes.
+
+Writes are noted by the middleware in main.py (any successful non-GET
+request by an authenticated user), in this worker's memory and in Redis
+so every worker agrees.
+"""
+import logging
+from typing import Optional
+
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+
+from . import database, oauth2, redis_client
+from .cache import TTLCache
+from .config import settings
+
+logger = logging.getLogger("read_routing")
+
+_recent_writers = TTLCache(10000, settings.read_your_writes_seconds)
+
+
+def enabled() -> bool:
+    return bool(database.replica_engines)
+
+
+def _redis_key(user_id: int) -> str:
+    return f"ryw:{user_id}"
+
+
+def request_user_id(request: Request) -> Optional[int]:
+    """User id from the bearer token (claims cache), without loading the user."""
+    auth = request.headers.get("authorization", "")
+    if not auth.startswith("Bearer "):
+        return None
+    return oauth2.token_user_id(auth.split(" ", 1)[1])
+
+
+async def note_write(user_id: int) -> None:
+    if not enabled():
+        return
+    _recent_writers.set(user_id, True)
+    client = redis_client.redis_client
+    if client is not None:
+        try:
+            await client.set(_redis_key(user_id), 1, ex=settings.read_your_writes_seconds)
+        except Exception as e:
+            logger.warning(f"Read-your-writes mark for {user_id} failed: {e}")
+
+
+async def wrote_recently(user_id: Optional[int]) -> bool:
+    if user_id is None:
+        return False
+    if _recent_writers.get(user_id):
+        return True
+    client = redis_client.redis_client
+    if client is None:
+        return False
+    try:
+        return bool(await client.exists(_redis_key(user_id)))
+    except Exception as e:
+        logger.warning(f"Read-your-writes check for {user_id} failed: {e}")
+        return True  # unsure: the primary is always correct
+
+
+async def _use_primary(request: Request) -> bool:
+    return not enabled() or await wrote_recently(request_user_id(request))
+
+
+# --- Dependencies for read-only routes ---
+async def get_read_db(request: Request):
+    """Sync Session: replica, or primary for recent writers."""
+    db = database.SessionLocal() if await _use_primary(request) else database.ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        await run_in_threadpool(db.close)
+
+
+async def get_async_read_db(request: Request):
+    """AsyncSession (or ThreadpoolSession): replica, or primary for recent writers."""
+    scope = database.session_scope if await _use_primary(request) else database.replica_session_scope
+    async with scope() as db:
+        yield db
@@ -0,0 +1,259 @@
+# app/realtime.py
+import asyncio
+import json
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import WebSocket
+
+from . import inbox, presence, redis_client, utils
+from .config import settings
+
+logger = logging.getLogger("realtime")
+
+
+class Connection:
+    """
+    One socket with its own bounded outbound queue and sender task, so a
+    slow client only ever delays itself.
+    """
+
+    def __init__(self, manager: "ConnectionManager", user_id: int, websocket: WebSocket):
+        self.manager = manager
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=settings.ws_send_queue_size)
+        self.closing = False
+        self._live: Optional[List[Tuple[Optional[str], str]]] = None  # held during replay()
+        self._replayed_to: Optional[Tuple[int, int]] = None
+        self._task = asyncio.create_task(self._sender())
+
+    def offer(self, text: str, stream_id: Optional[str] = None) -> None:
+        """Enqueue without waiting; apply the slow-consumer policy when full."""
+        if self.closing:
+            return
+        if stream_id is not None and self._replayed_to is not None:
+            if inbox.parse_id(stream_id) <= self._replayed_to:
+                return  # replay() already sent it
+        if self._live is not None:
+            self._live.append((stream_id, text))
+            return
+        try:
+            self.queue.put_nowait(text)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        policy = settings.ws_slow_consumer_policy
+        self.manager.dropped += 1
+        if policy == "drop_oldest":
+            self.queue.get_nowait()
+            self.queue.put_nowait(text)
+        elif policy == "disconnect":
+            self.manager.slow_disconnects += 1
+            self.closing = True
+            utils.spawn(self.manager.drop(self, code=1013))  # Try again later
+        # drop_newest: discard `text`
+
+    def send_json(self, message: dict) -> None:
+        self.offer(json.dumps(message))
+
+    async def replay(self, last_id: str) -> None:
+        """
+        Send what was logged for this user after last_id, then the live
+        messages that arrived meanwhile, in stream order and without
+        duplicates.
+        """
+        self._live = []
+        replayed: List[str] = []
+        try:
+            oldest = await inbox.trimmed_past(self.user_id, last_id)
+            if oldest:
+                # Trimmed past the client's position: it must reload history
+                replayed.append(json.dumps({"replay_truncated": True, "oldest_id": oldest}))
+            async for batch in inbox.read_after(self.user_id, last_id):
+                for stream_id, text in batch:
+                    replayed.append(text)
+                    last_id = stream_id
+        finally:
+            live, self._live = self._live, None
+            # From here on, offer() drops anything up to the last replayed
+            # entry: live copies of it, now or arriving late from other nodes
+            self._replayed_to = inbox.parse_id(last_id)
+            for text in replayed:
+                self.offer(text)
+            # Unlogged messages (stream_id None) keep their place at the end
+            live.sort(key=lambda entry: inbox.parse_id(entry[0]) if entry[0] else (math.inf,))
+            for stream_id, text in live:
+                self.offer(text, stream_id)
+
+    async def _sender(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Any send failure means the socket is gone, not just WebSocketDisconnect
+            utils.spawn(self.manager.drop(self))
+
+    def stop(self):
+        self.closing = True
+        self._task.cancel()
+
+
+# In-memory connection manager (per worker; presence + Redis route across workers)
+class ConnectionManager:
+    def __init__(self):
+        self.active_connections: Dict[int, List[Connection]] = {}
+        self.subscriber: Optional["RedisSubscriber"] = None
+        self.presence: Optional[presence.Presence] = None
+        self.dropped = 0
+        self.slow_disconnects = 0
+
+    async def connect(self, user_id: int, websocket: WebSocket) -> Connection:
+        await websocket.accept()
+        conn = Connection(self, user_id, websocket)
+        first = user_id not in self.active_connections
+        self.active_connections.setdefault(user_id, []).append(conn)
+        if first:
+            # Listen before advertising, so nothing routed here is missed
+            if self.subscriber:
+                await self.subscriber.start()
+            if self.presence:
+                await self.presence.register(user_id)
+        return conn
+
+    async def disconnect(self, user_id: int, websocket: WebSocket):
+        for conn in self.active_connections.get(user_id, []):
+            if conn.websocket is websocket:
+                await self._remove(conn)
+                return
+
+    async def drop(self, conn: Connection, code: int = 1011):
+        """Server-side disconnect (dead or too slow socket)."""
+        if await self._remove(conn):
+            try:
+                await conn.websocket.close(code=code)
+            except Exception:
+                pass
+
+    async def _remove(self, conn: Connection) -> bool:
+        conns = self.active_connections.get(conn.user_id)
+        if not conns or conn not in conns:
+            return False
+        conn.stop()
+        conns.remove(conn)
+        if not conns:
+            del self.active_connections[conn.user_id]
+            if self.presence:
+                await self.presence.unregister(conn.user_id)
+        return True
+
+    def send_text(self, text: str, user_id: int, stream_id: Optional[str] = None):
+        """Fan an already-encoded message out to every socket of user_id."""
+        for conn in self.active_connections.get(user_id, ()):
+            conn.offer(text, stream_id)
+
+    def send_personal_message(self, message: dict, user_id: int):
+        if user_id in self.active_connections:
+            self.send_text(json.dumps(message), user_id)  # encoded once
+
+    def stats(self) -> dict:
+        depths = [c.queue.qsize() for conns in self.active_connections.values() for c in conns]
+        return {
+            "users": len(self.active_connections),
+            "connections": len(depths),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+        }
+
+
+class RedisSubscriber:
+    """
+    One asyncio-native pub/sub connection per worker, on this node's own
+    channel node:{NODE_ID}. Senders route through the presence registry,
+    so only messages for users connected here arrive, as
+    "user_id:stream_id:json".
+    Started with the first local socket; the listener blocks on the
+    socket, so an idle node costs no CPU.
+    """
+
+    def __init__(self, manager: ConnectionManager):
+        self.manager = manager
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        client = redis_client.redis_client
+        if client is None or self._pubsub is not None:
+            return
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(presence.node_channel(presence.NODE_ID))
+        self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                msg = await self._pubsub.get_message(timeout=None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis subscriber error: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if not msg or msg.get("type") != "message":
+                continue
+            try:
+                # Already JSON: pass the published text straight through
+                user_id, stream_id, text = msg["data"].split(":", 2)
+                self.manager.send_text(text, int(user_id), stream_id or None)
+            except Exception as e:
+                logger.error(f"Dispatch of node message failed: {e}")
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+async def publish(user_id: int, payload: dict):
+    """
+    Log the message in user_id's inbox stream, then deliver it to every
+    socket of user_id: in-process for sockets on this worker, one PUBLISH
+    per other node that holds one, nothing at all when the user is
+    offline (they replay it from the stream on reconnect).
+    """
+    text = json.dumps(payload)
+    try:
+        stream_id = await inbox.append(user_id, text)
+    except Exception as e:
+        logger.warning(f"Inbox append for {user_id} failed: {e}")
+        stream_id = None
+    if stream_id:
+        text = inbox.with_stream_id(text, stream_id)
+    manager.send_text(text, user_id, stream_id)
+
+    client = redis_client.redis_client
+    if client is None:
+        return  # No Redis: this worker is the only one that can deliver
+    try:
+        nodes = await manager.presence.nodes(user_id)
+    except Exception as e:
+        logger.warning(f"Presence lookup for {user_id} failed: {e}")
+        return
+    nodes.discard(presence.NODE_ID)
+    for node in nodes:
+        await client.publish(presence.node_channel(node), f"{user_id}:{stream_id or ''}:{text}")
+
+
+manager = ConnectionManager()
+manager.subscriber = RedisSubscriber(manager)
+manager.presence = presence.Presence(lambda: manager.active_connections.keys())
@@ -1,8 +1,11 @@
 # app/redis_client.py
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
 from contextlib import asynccontextmanager
 from .config import settings
+from . import metrics
 import logging
+import time
 
 logger = logging.getLogger("redis")
 logger.setLevel(logging.INFO)
@@ -10,12 +13,41 @@ logger.setLevel(logging.INFO)
 _redis_client = None
 
 
+class InstrumentedPipeline(Pipeline):
+    """Pipeline whose execute() counts each queued command (app.metrics)."""
+
+    async def execute(self, raise_on_error: bool = True):
+        commands = len(self.command_stack)
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            metrics.record_redis(commands, time.perf_counter() - start)
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that times every command for the current request."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            metrics.record_redis(1, time.perf_counter() - start)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
 @asynccontextmanager
 async def get_redis_client():
     global _redis_client
     if _redis_client is None:
         try:
-            _redis_client = await redis.from_url(
+            client_class = InstrumentedRedis if settings.metrics_enabled else redis.Redis
+            _redis_client = await client_class.from_url(
                 settings.REDIS_URL,
                 encoding="utf-8",
                 decode_responses=True,
@@ -1,7 +1,8 @@
 # app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas, utils, database, oauth2
 
@@ -10,23 +11,34 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
 ):
-    user = db.query(models.User).filter(
-        (models.User.email == form_data.username) |
-        (models.User.username == form_data.username)
-    ).first()
+    user = (await db.execute(
+        select(models.User).filter(
+            (models.User.email == form_data.username) |
+            (models.User.username == form_data.username)
+        )
+    )).scalars().first()
 
-    if not user or not utils.verify_password(form_data.password, user.password):
+    valid, new_hash = (
+        await utils.verify_and_update_async(form_data.password, user.password)
+        if user else (False, None)
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Hash made with older Argon2 cost settings: store the upgraded one
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
     access_token = oauth2.create_access_token(
         data={"user_id": user.id, "username": user.username}
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
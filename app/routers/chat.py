@@ -1,13 +1,18 @@
 # app/routers/chat.py
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException, status
-from fastapi.concurrency import run_in_threadpool
-from sqlalchemy.orm import Session, joinedload
-from typing import Dict, List
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException, Path, Query, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Optional
 import json
-import asyncio
 
-from .. import models, schemas, database, oauth2
-from ..redis_client import redis_client  # Global client from lifespan
+from .. import models, schemas, database, oauth2, realtime, inbox
+from ..chat_store import writer
+from ..pagination import decode_cursor, encode_cursor, split_page
+from ..realtime import manager
+
+MESSAGE_FIELDS = ("id", "content", "created_at", "sender_id", "receiver_id")
 
 
 router = APIRouter(
@@ -17,68 +22,94 @@ router = APIRouter(
 )
 
 
-# In-memory connection manager (for dev; Redis handles delivery)
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-
-    async def connect(self, user_id: int, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.setdefault(user_id, []).append(websocket)
-
-    def disconnect(self, user_id: int, websocket: WebSocket):
-        if user_id in self.active_connections:
-            self.active_connections[user_id] = [
-                ws for ws in self.active_connections[user_id] if ws != websocket
-            ]
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-
-    async def send_personal_message(self, message: dict, user_id: int):
-        if user_id not in self.active_connections:
-            return
-        dead = []
-        for ws in self.active_connections[user_id]:
-            try:
-                await ws.send_text(json.dumps(message))
-            except WebSocketDisconnect:
-                dead.append(ws)
-        for ws in dead:
-            self.disconnect(user_id, ws)
-
-
-manager = ConnectionManager()
+@router.get("/{peer_id}/messages", response_model=schemas.ChatHistoryPage)
+async def get_messages(
+    peer_id: int = Path(..., ge=1),
+    before: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
+):
+    """
+    DM history with one peer, newest first. Each page is a backward range
+    scan of (conversation_key, created_at, id) — no sort, no union of the
+    two users' messages.
+    """
+    peer = await oauth2.load_principal(peer_id, db)
+    if peer is None:
+        raise HTTPException(status_code=404, detail=f"User with id {peer_id} not found")
+
+    m = models.ChatMessage
+    query = (
+        select(m.id, m.content, m.created_at, m.sender_id, m.receiver_id)
+        .where(m.conversation_key == models.conversation_key(current_user.id, peer_id))
+        .order_by(m.created_at.desc(), m.id.desc())
+        .limit(limit + 1)
+    )
+    cursor = decode_cursor(before, str, int)
+    if cursor:
+        try:
+            created_at = datetime.fromisoformat(cursor[0])
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.where(tuple_(m.created_at, m.id) < tuple_(created_at, cursor[1]))
+
+    rows, has_more = split_page((await db.execute(query)).all(), limit)
+
+    # Only two users can appear: map ids to them instead of joining
+    users = {
+        current_user.id: schemas.UserResponse.from_orm(current_user),
+        peer_id: schemas.UserResponse.from_orm(peer),
+    }
+    items = [
+        schemas.ChatMessageResponse(
+            id=row.id,
+            content=row.content,
+            created_at=row.created_at,
+            sender_id=row.sender_id,
+            receiver_id=row.receiver_id,
+            sender=users[row.sender_id],
+            receiver=users[row.receiver_id],
+        )
+        for row in rows
+    ]
+    last = rows[-1] if rows else None
+    return schemas.ChatHistoryPage(
+        items=items,
+        next_cursor=encode_cursor(last.created_at.isoformat(), last.id) if has_more else None
+    )
 
 
 @router.websocket("/ws/{receiver_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
     receiver_id: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user_ws)
+    last_id: Optional[str] = None,
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user_ws)
 ):
-    await manager.connect(current_user.id, websocket)
-    listener_task = None
+    # Both participants are fixed for the socket's lifetime: resolve them
+    # once (principal cache) and build every payload from memory
+    async with database.session_scope() as db:
+        receiver = await oauth2.load_principal(receiver_id, db)
+    if receiver is None:
+        await websocket.close(code=4004)  # Custom code: unknown receiver
+        return
+    sender_out = jsonable_encoder(schemas.UserResponse.from_orm(current_user))
+    receiver_out = jsonable_encoder(schemas.UserResponse.from_orm(receiver))
+
+    # First socket for this user on this worker registers the user's
+    # presence here, so other nodes route their messages to us
+    conn = await manager.connect(current_user.id, websocket)
 
     try:
-        # Subscribe to Redis Pub/Sub for this user
-        pubsub = redis_client.pubsub()
-        await run_in_threadpool(pubsub.subscribe, f"user:{current_user.id}")
-
-        # Background Redis listener
-        async def redis_listener():
-            while True:
-                msg = await run_in_threadpool(
-                    pubsub.get_message,
-                    ignore_subscribe_messages=True,
-                    timeout=1.0
-                )
-                if msg and msg.get("type") == "message":
-                    data = json.loads(msg["data"])
-                    await manager.send_personal_message(data, current_user.id)
-                await asyncio.sleep(0.01)
-
-        listener_task = asyncio.create_task(redis_listener())
+        # Resuming: replay what this user's inbox stream logged after last_id
+        if last_id is not None:
+            try:
+                inbox.parse_id(last_id)
+            except ValueError:
+                conn.send_json({"error": "Invalid last_id"})
+            else:
+                await conn.replay(last_id)
 
         # Main loop: receive from WebSocket
         while True:
@@ -86,60 +117,54 @@ async def websocket_endpoint(
             try:
                 message = json.loads(data)
             except json.JSONDecodeError:
-                await websocket.send_text(json.dumps({"error": "Invalid JSON"}))
+                conn.send_json({"error": "Invalid JSON"})
+                continue
+
+            # Acknowledge delivery: trims the inbox stream up to this id
+            if "ack" in message:
+                try:
+                    await inbox.ack(current_user.id, str(message["ack"]))
+                except ValueError:
+                    conn.send_json({"error": "Invalid ack"})
                 continue
 
             # Validate receiver
             if message.get("receiver_id") != receiver_id:
-                await websocket.send_text(json.dumps({"error": "Invalid receiver"}))
+                conn.send_json({"error": "Invalid receiver"})
                 continue
 
             content = message.get("content")
             if not content or not isinstance(content, str):
-                await websocket.send_text(json.dumps({"error": "Content required"}))
+                conn.send_json({"error": "Content required"})
                 continue
 
-            # Save to DB
-            db_message = models.ChatMessage(
-                content=content.strip(),
-                sender_id=current_user.id,
-                receiver_id=receiver_id
-            )
-            db.add(db_message)
-            db.commit()
-            db.refresh(db_message)
-
-            # Load full message with sender/receiver
-            full_msg = db.query(models.ChatMessage).options(
-                joinedload(models.ChatMessage.sender),
-                joinedload(models.ChatMessage.receiver)
-            ).filter(models.ChatMessage.id == db_message.id).first()
-
-            if not full_msg:
+            # Id and timestamp are assigned now; the row is written behind
+            row = await writer.new_message(current_user.id, receiver_id, content.strip())
+            try:
+                await writer.save(row)
+            except Exception:
+                conn.send_json({"error": "Message not saved"})
                 continue
 
-            response = schemas.ChatMessageResponse.from_orm(full_msg)
-            payload = response.dict()
+            # ChatMessageResponse fields only; the row also has conversation_key
+            payload = jsonable_encoder({
+                **{field: row[field] for field in MESSAGE_FIELDS},
+                "sender": sender_out,
+                "receiver": receiver_out,
+            })
 
-            # Publish to receiver via Redis
-            await run_in_threadpool(
-                redis_client.publish,
-                f"user:{receiver_id}",
-                json.dumps(payload)
-            )
+            # Route to the receiver's node(s); skipped if they are offline
+            await realtime.publish(receiver_id, payload)
 
             # Echo back to sender
-            await manager.send_personal_message(payload, current_user.id)
+            manager.send_personal_message(payload, current_user.id)
 
     except WebSocketDisconnect:
-        manager.disconnect(current_user.id, websocket)
+        await manager.disconnect(current_user.id, websocket)
     except Exception as e:
         print(f"Chat error: {e}")
-        manager.disconnect(current_user.id, websocket)
+        await manager.disconnect(current_user.id, websocket)
         try:
             await websocket.close(code=1011)
         except:
-            pass
-    finally:
-        if listener_task:
-            listener_task.cancel()
\ No newline at end of file
+            pass
\ No newline at end of file
@@ -1,8 +1,10 @@
 # app/routers/comment.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
-from typing import List
-from .. import models, schemas, database, oauth2
+from typing import Optional
+from .. import models, schemas, database, oauth2, comment_tree, etags, read_routing
+from ..pagination import decode_cursor, encode_cursor
 
 
 router = APIRouter(
@@ -15,8 +17,7 @@ router = APIRouter(
 def get_post_or_404(db: Session, post_id: int) -> models.Post:
     """Helper: fetch post with joinedload or 404"""
     post = db.query(models.Post).options(
-        joinedload(models.Post.owner),
-        joinedload(models.Post.voted_by)
+        joinedload(models.Post.owner)
     ).filter(models.Post.id == post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
@@ -33,11 +34,12 @@ def create_comment(
     post_id: int,
     comment_in: schemas.CommentCreate,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user)
 ):
     post = get_post_or_404(db, post_id)
 
     # Validate parent_id if provided
+    parent = None
     if comment_in.parent_id:
         parent = db.query(models.Comment).filter(
             models.Comment.id == comment_in.parent_id,
@@ -45,6 +47,7 @@ def create_comment(
         ).first()
         if not parent:
             raise HTTPException(status_code=404, detail="Parent comment not found")
+        _require_path(parent)
 
     db_comment = models.Comment(
         **comment_in.dict(),
@@ -52,52 +55,132 @@ def create_comment(
         owner_id=current_user.id
     )
     db.add(db_comment)
+    post.revision = models.Post.revision + 1  # new thread ETag
+    db.flush()  # assigns the id the path is built from
+    comment_tree.assign_path(db_comment, parent)
     db.commit()
     db.refresh(db_comment)
 
-    # Load full tree for response
-    return _load_comment_with_replies(db, db_comment)
+    # A new comment has no replies
+    return comment_tree.to_response(db_comment)
 
 
 @router.get(
     "/",
-    response_model=List[schemas.CommentResponse],
-    summary="Get all top-level comments with nested replies"
+    response_model=schemas.CommentPage,
+    summary="Get top-level comments with a bounded slice of their replies"
 )
 def get_comments(
+    request: Request,
+    response: Response,
     post_id: int,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user, use_cache=True)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Top-level comments per page"),
+    max_depth: int = Query(3, ge=0, le=10, description="Reply levels below each comment"),
+    replies_per_node: int = Query(5, ge=1, le=50, description="Replies shown per comment"),
+    db: Session = Depends(read_routing.get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user, use_cache=True)
 ):
-    post = get_post_or_404(db, post_id)
+    etag = _thread_etag(db, post_id)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+    after = decode_cursor(cursor, int)
+
+    items, has_more = comment_tree.load_page(
+        db, post_id, None, after[0] if after else 0,
+        limit, max_depth, replies_per_node
+    )
+    etags.tag(response, etag)
+    return schemas.CommentPage(
+        items=items,
+        next_cursor=encode_cursor(items[-1].id) if has_more else None
+    )
+
+
+@router.get(
+    "/{comment_id}/replies",
+    response_model=schemas.CommentPage,
+    summary="Load more replies: the next slice of a comment's subtree"
+)
+def get_replies(
+    request: Request,
+    response: Response,
+    post_id: int,
+    comment_id: int,
+    cursor: Optional[str] = Query(None, description="replies_cursor or next_cursor"),
+    limit: int = Query(20, ge=1, le=100, description="Direct replies per page"),
+    max_depth: int = Query(3, ge=0, le=10, description="Reply levels below each reply"),
+    replies_per_node: int = Query(5, ge=1, le=50, description="Replies shown per comment"),
+    db: Session = Depends(read_routing.get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user, use_cache=True)
+):
+    etag = _thread_etag(db, post_id)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+    parent = _get_comment_or_404(db, post_id, comment_id)
+    after = decode_cursor(cursor, int)
+
+    items, has_more = comment_tree.load_page(
+        db, post_id, parent, after[0] if after else 0,
+        limit, max_depth, replies_per_node
+    )
+    etags.tag(response, etag)
+    return schemas.CommentPage(
+        items=items,
+        next_cursor=encode_cursor(items[-1].id) if has_more else None
+    )
+
 
-    # Get top-level comments (parent_id IS NULL)
-    top_comments = db.query(models.Comment).filter(
-        models.Comment.post_id == post_id,
-        models.Comment.parent_id.is_(None)
-    ).order_by(models.Comment.created_at.asc()).all()
-
-    return [_load_comment_with_replies(db, c, current_user=current_user) for c in top_comments]
-
-
-def _load_comment_with_replies(
-    db: Session,
-    comment: models.Comment,
-    current_user: models.User = None
-) -> schemas.CommentResponse:
-    """
-    Recursively load comment + replies with owner data.
-    Uses joinedload to avoid N+1.
-    """
-    # Reload with full relationships
-    db_comment = db.query(models.Comment).options(
-        joinedload(models.Comment.owner),
-        joinedload(models.Comment.replies).joinedload(models.Comment.owner)
-    ).filter(models.Comment.id == comment.id).first()
-
-    response = schemas.CommentResponse.from_orm(db_comment)
-    response.replies = [
-        _load_comment_with_replies(db, reply, current_user)
-        for reply in db_comment.replies
-    ]
-    return response
\ No newline at end of file
+@router.get(
+    "/{comment_id}",
+    response_model=schemas.CommentResponse,
+    summary="Permalink: a comment with its replies and parent context"
+)
+def get_comment(
+    request: Request,
+    response: Response,
+    post_id: int,
+    comment_id: int,
+    context: int = Query(0, ge=0, le=20, description="Ancestors to include above the comment"),
+    depth: int = Query(3, ge=0, le=10, description="Reply levels to include below it"),
+    replies_per_node: int = Query(5, ge=1, le=50, description="Replies shown per comment"),
+    db: Session = Depends(read_routing.get_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user, use_cache=True)
+):
+    etag = _thread_etag(db, post_id)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+    comment = _get_comment_or_404(db, post_id, comment_id)
+    etags.tag(response, etag)
+    return comment_tree.load_with_context(
+        db, comment, context=context, max_depth=depth, replies_per_node=replies_per_node
+    )
+
+
+def _thread_etag(db: Session, post_id: int) -> str:
+    """ETag of a post's comment thread: one primary-key lookup, 404 if no post."""
+    revision = db.scalar(select(models.Post.revision).where(models.Post.id == post_id))
+    if revision is None:
+        raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
+    return etags.make_etag("thread", post_id, revision)
+
+
+def _get_comment_or_404(db: Session, post_id: int, comment_id: int) -> models.Comment:
+    comment = db.query(models.Comment).filter(
+        models.Comment.id == comment_id,
+        models.Comment.post_id == post_id
+    ).first()
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    return _require_path(comment)
+
+
+def _require_path(comment: models.Comment) -> models.Comment:
+    """503 for a row written before comments.path was backfilled (see maintenance.py)."""
+    if comment.path is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="This comment thread is being migrated, try again shortly",
+            headers={"Retry-After": "30"},
+        )
+    return comment
@@ -1,10 +1,16 @@
 # app/routers/post.py
-from fastapi import APIRouter, Depends, HTTPException, Path, status, Body, Query
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
-from sqlalchemy import or_
+import logging
 
-from .. import models, schemas, database, oauth2
+from anyio import from_thread
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, status, Body, Query
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Set
+from sqlalchemy import false, select
+
+from .. import models, schemas, database, oauth2, votes, search, post_cache, etags, serializers, hot_feed, read_routing, vote_counter
+from ..pagination import decode_cursor, encode_cursor, split_page
+from ..serializers import ORJSONResponse
 
 
 router = APIRouter(
@@ -13,49 +19,197 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+logger = logging.getLogger("post")
+
 forbidden_exception = HTTPException(
     status_code=status.HTTP_403_FORBIDDEN,
     detail="Not authorized to perform this action"
 )
 
 
-def _enrich_post(post: models.Post, current_user: Optional[models.User] = None):
-    """Add votes_count & is_voted to PostResponse."""
+def _enrich_post(post: models.Post, is_voted: bool = False):
+    """Build PostResponse; votes_count is the denormalized column."""
     response = schemas.PostResponse.from_orm(post)
-    response.votes_count = len(post.voted_by)
-    response.is_voted = current_user in post.voted_by if current_user else False
+    response.is_voted = is_voted
     return response
 
 
+def _is_voted(db: Session, post_id: int, current_user: Optional[oauth2.Principal]) -> bool:
+    if not current_user:
+        return False
+    return bool(db.scalar(votes.is_voted_stmt(current_user.id, post_id)))
+
+
+async def _load_bodies(db: AsyncSession, ids: List[int]) -> Dict[int, dict]:
+    """Viewer-independent post bodies: Redis first, then one query for the misses."""
+    bodies, versions = await post_cache.get_posts(ids)
+    missing = [i for i in ids if i not in bodies]
+    if missing:
+        result = await db.execute(serializers.post_select().filter(models.Post.id.in_(missing)))
+        loaded = {row.id: serializers.post_dict(row) for row in result.all()}
+        await post_cache.put_posts(loaded, versions)
+        bodies.update(loaded)
+    return bodies
+
+
+async def _page(
+    db: AsyncSession,
+    ids: List[int],
+    current_user: Optional[oauth2.Principal],
+) -> List[dict]:
+    """
+    PostResponse-shaped dicts for ids in order, with the viewer's is_voted
+    and the unflushed vote deltas overlaid (cached bodies stay shared).
+    """
+    bodies = await _load_bodies(db, ids)
+    voted = await _voted(db, ids, current_user)
+    items = [{**bodies[i], "is_voted": i in voted} for i in ids if i in bodies]
+    return await _add_pending_votes(items)
+
+
+async def _add_pending_votes(items: List[dict]) -> List[dict]:
+    """VOTE_COUNTER=redis: add the deltas not yet in votes_count (one MGET)."""
+    try:
+        pending = await vote_counter.counter.pending([item["id"] for item in items])
+    except Exception as e:
+        logger.warning(f"Pending vote counts unavailable: {e}")
+        return items
+    for item in items:
+        item["votes_count"] += pending.get(item["id"], 0)
+    return items
+
+
+async def _voted(db: AsyncSession, ids: List[int], current_user: Optional[oauth2.Principal]) -> Set[int]:
+    """One IN query over the page's post ids for the viewer."""
+    if not current_user:
+        return set()
+    return await votes.voted_post_ids(db, current_user.id, ids)
+
+
 # ---------- GET (public) ----------
-@router.get("/", response_model=List[schemas.PostResponse])
-def get_posts(
-    db: Session = Depends(database.get_db),
-    skip: int = Query(0, ge=0),
+# The read routes return ORJSONResponse directly: their dicts come from
+# app/serializers.py and skip response_model validation.
+@router.get("/", response_model=schemas.PostPage)
+async def get_posts(
+    db: AsyncSession = Depends(read_routing.get_async_read_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(10, ge=1, le=100),
-    q: Optional[str] = Query(None, alias="q"),
-    current_user: Optional[models.User] = Depends(oauth2.get_current_user, use_cache=True),
+    q: Optional[str] = Query(None, alias="q", description='Words, "exact phrase", or prefix*'),
+    current_user: Optional[oauth2.Principal] = Depends(oauth2.get_current_user, use_cache=True),
 ):
-    query = db.query(models.Post).options(joinedload(models.Post.voted_by)).order_by(models.Post.id.desc())
-
     if q:
-        pattern = f"%{q}%"
-        query = query.filter(or_(models.Post.title.ilike(pattern), models.Post.content.ilike(pattern)))
+        return await _search_posts(db, q, cursor, limit, current_user)
+
+    after = decode_cursor(cursor, int)
+    after_id = after[0] if after else None
+    page, feed_version = (None, 0) if skip else await post_cache.get_feed_page(after_id, limit)
+    if page is not None:
+        ids, has_more = page
+        items = await _page(db, ids, current_user)
+    else:
+        # One projected query (post + owner columns) with keyset pagination
+        # on the primary key, then one IN query for is_voted: two at most.
+        # Bodies are not cached from here (their versions were not read
+        # first); the next read of the page caches them.
+        query = serializers.post_select().order_by(models.Post.id.desc())
+        if after_id is not None:
+            query = query.filter(models.Post.id < after_id)
+        elif skip:
+            query = query.offset(skip)
+        result = await db.execute(query.limit(limit + 1))
+        rows, has_more = split_page(result.all(), limit)
+        ids = [row.id for row in rows]
+        if not skip:
+            await post_cache.put_feed_page(after_id, limit, feed_version, ids, has_more)
+        voted = await _voted(db, ids, current_user)
+        items = await _add_pending_votes([serializers.post_dict(row, row.id in voted) for row in rows])
 
-    posts = query.offset(skip).limit(limit).all()
-    return [_enrich_post(p, current_user) for p in posts]
+    return ORJSONResponse({
+        "items": items,
+        "next_cursor": encode_cursor(ids[-1]) if has_more else None,
+    })
+
+
+@router.get("/hot", response_model=schemas.PostPage)
+async def get_hot_posts(
+    db: AsyncSession = Depends(read_routing.get_async_read_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(10, ge=1, le=100),
+    current_user: Optional[oauth2.Principal] = Depends(oauth2.get_current_user, use_cache=True),
+):
+    """Posts ranked by votes and age (app/hot_feed.py); the cursor is a rank offset."""
+    after = decode_cursor(cursor, int)
+    offset = after[0] if after else 0
+    if offset < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    ids = await hot_feed.page(offset, limit + 1)
+    if ids is None:
+        # No Redis: the same ranking computed in SQL (a scan; fallback only)
+        result = await db.execute(hot_feed.top_stmt(offset, limit + 1))
+        ids = result.scalars().all()
+    ids, has_more = split_page(ids, limit)
+    return ORJSONResponse({
+        "items": await _page(db, ids, current_user),
+        "next_cursor": encode_cursor(offset + limit) if has_more else None,
+    })
+
+
+async def _search_posts(
+    db: AsyncSession,
+    q: str,
+    cursor: Optional[str],
+    limit: int,
+    current_user: Optional[oauth2.Principal],
+) -> ORJSONResponse:
+    """Ranked search; the cursor seeks on (rank, id)."""
+    hits, has_more = split_page(
+        await search.backend.search(db, q, limit + 1, after=decode_cursor(cursor, float, int)),
+        limit
+    )
+    last_id, last_rank = hits[-1] if hits else (None, None)
+    return ORJSONResponse({
+        "items": await _page(db, [post_id for post_id, _ in hits], current_user),
+        "next_cursor": encode_cursor(last_rank, last_id) if has_more else None,
+    })
 
 
 @router.get("/{post_id}", response_model=schemas.PostResponse)
-def get_post(
+async def get_post(
+    request: Request,
     post_id: int = Path(..., ge=1),
-    db: Session = Depends(database.get_db),
-    current_user: Optional[models.User] = Depends(oauth2.get_current_user, use_cache=True),
+    db: AsyncSession = Depends(read_routing.get_async_read_db),
+    current_user: Optional[oauth2.Principal] = Depends(oauth2.get_current_user, use_cache=True),
 ):
-    post = db.query(models.Post).options(joinedload(models.Post.voted_by)).get(post_id)
-    if not post:
+    # Revalidation is one primary-key lookup. The viewer's vote is part of
+    # the tag: with VOTE_COUNTER=redis the revision only moves on flush.
+    voted = votes.is_voted_expr(current_user.id, post_id) if current_user else false()
+    row = (await db.execute(select(models.Post.revision, voted).where(models.Post.id == post_id))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
+    revision, is_voted = row
+    etag = etags.make_etag("post", post_id, revision, current_user.id if current_user else 0, int(is_voted))
+    if etags.matches(request, etag):
+        return etags.not_modified(etag)
+
+    items = await _page(db, [post_id], current_user)
+    if not items:
         raise HTTPException(status_code=404, detail=f"Post with id {post_id} not found")
-    return _enrich_post(post, current_user)
+    response = ORJSONResponse(items[0])
+    etags.tag(response, etag)
+    return response
+
+
+@router.post("/batch", response_model=schemas.PostBatch)
+async def get_posts_batch(
+    batch: schemas.PostBatchRequest,
+    db: AsyncSession = Depends(read_routing.get_async_read_db),
+    current_user: Optional[oauth2.Principal] = Depends(oauth2.get_current_user, use_cache=True),
+):
+    """Many posts by id in one round trip (cache, then one query, then one IN for is_voted)."""
+    ids = list(dict.fromkeys(batch.ids))
+    return ORJSONResponse({"items": await _page(db, ids, current_user)})
 
 
 # ---------- CREATE ----------
@@ -63,13 +217,16 @@ def get_post(
 def create_post(
     post: schemas.PostCreate,
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     new_post = models.Post(**post.dict(), owner_id=current_user.id)
     db.add(new_post)
     db.commit()
     db.refresh(new_post)
-    return _enrich_post(new_post, current_user)
+    search.backend.index(new_post.id, new_post.title, new_post.content)
+    from_thread.run(lambda: post_cache.invalidate(feed=True))
+    from_thread.run(hot_feed.add, new_post.id, new_post.created_at)
+    return _enrich_post(new_post)
 
 
 # ---------- UPDATE / DELETE ----------
@@ -77,7 +234,7 @@ def create_post(
 def delete_post(
     post_id: int = Path(..., ge=1),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     post = db.get(models.Post, post_id)
     if not post:
@@ -86,6 +243,9 @@ def delete_post(
         raise forbidden_exception
     db.delete(post)
     db.commit()
+    search.backend.remove(post_id)
+    from_thread.run(lambda: post_cache.invalidate([post_id], feed=True))
+    from_thread.run(hot_feed.remove, post_id)
     return None
 
 
@@ -94,7 +254,7 @@ def update_post(
     post_id: int = Path(..., ge=1),
     post: schemas.PostCreate = Body(...),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     db_post = db.get(models.Post, post_id)
     if not db_post:
@@ -104,10 +264,13 @@ def update_post(
 
     for k, v in post.dict().items():
         setattr(db_post, k, v)
+    db_post.revision = models.Post.revision + 1
 
     db.commit()
     db.refresh(db_post)
-    return _enrich_post(db_post, current_user)
+    search.backend.index(db_post.id, db_post.title, db_post.content)
+    from_thread.run(post_cache.invalidate, [post_id])
+    return _enrich_post(db_post, _is_voted(db, post_id, current_user))
 
 
 @router.patch("/{post_id}", response_model=schemas.PostResponse)
@@ -115,7 +278,7 @@ def partial_update_post(
     post_id: int = Path(..., ge=1),
     post: schemas.PostUpdate = Body(...),
     db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
     db_post = db.get(models.Post, post_id)
     if not db_post:
@@ -126,7 +289,10 @@ def partial_update_post(
     data = post.dict(exclude_unset=True)
     for k, v in data.items():
         setattr(db_post, k, v)
+    db_post.revision = models.Post.revision + 1
 
     db.commit()
     db.refresh(db_post)
-    return _enrich_post(db_post, current_user)
\ No newline at end of file
+    search.backend.index(db_post.id, db_post.title, db_post.content)
+    from_thread.run(post_cache.invalidate, [post_id])
+    return _enrich_post(db_post, _is_voted(db, post_id, current_user))
\ No newline at end of file
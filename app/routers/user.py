@@ -1,10 +1,13 @@
 # app/routers/user.py
 from fastapi import APIRouter, Depends, HTTPException, Path, status, Body
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Literal
 
 from .. import models, schemas, utils
-from ..database import get_db
+from ..database import get_async_db
+from ..read_routing import get_read_db
 
 
 router = APIRouter(
@@ -20,22 +23,24 @@ router = APIRouter(
     response_model=schemas.UserResponse,
     summary="Create a new user",
 )
-def create_user(
+async def create_user(
     user: schemas.UserCreate = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> schemas.UserResponse:
     """
     Register a new user.
 
     - **email** must be unique
     - **username** must be unique
-    - Password is hashed with Argon2 (via `utils.hash_password`)
+    - Password is hashed with Argon2 in the hashing pool (via `utils.hash_password_async`)
     """
     # Check for duplicate email OR username
-    existing = db.query(models.User).filter(
-        (models.User.email == user.email) |
-        (models.User.username == user.username)
-    ).first()
+    existing = (await db.execute(
+        select(models.User).filter(
+            (models.User.email == user.email) |
+            (models.User.username == user.username)
+        )
+    )).scalars().first()
 
     if existing:
         field: Literal["email", "username"] = (
@@ -46,8 +51,8 @@ def create_user(
             detail=f"{field.capitalize()} already registered",
         )
 
-    # Hash password using shared utility
-    hashed = utils.hash_password(user.password)
+    # Hash password off the event loop, in the shared hashing pool
+    hashed = await utils.hash_password_async(user.password)
 
     db_user = models.User(
         email=user.email,
@@ -55,8 +60,8 @@ def create_user(
         password=hashed,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 
@@ -67,7 +72,7 @@ def create_user(
 )
 def get_user(
     user_id: int = Path(..., ge=1, description="The ID of the user to retrieve"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ) -> schemas.UserResponse:
     """
     Retrieve a user by their numeric ID.
@@ -1,45 +1,74 @@
 # app/routers/vote.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+import logging
 
-from .. import models, schemas, database, oauth2
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .. import models, schemas, database, oauth2, votes, post_cache, serializers, vote_counter, hot_feed, read_routing
+from ..config import settings
+from ..pagination import parse_ids
+from ..serializers import ORJSONResponse
+
+
+logger = logging.getLogger("vote")
 
 router = APIRouter(prefix="/vote", tags=["vote"])
 
 
+@router.get("/state", response_model=schemas.VoteStates)
+async def vote_state(
+    post_ids: str = Query(..., description="Comma-separated post ids"),
+    db: AsyncSession = Depends(read_routing.get_async_read_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
+):
+    """The caller's vote and the vote count for many posts, in one query."""
+    ids = parse_ids(post_ids, settings.batch_max_ids)
+    result = await db.execute(votes.vote_state_stmt(current_user.id, ids))
+    states = {row.post_id: dict(row._mapping) for row in result}
+    for post_id, delta in (await vote_counter.counter.pending(list(states))).items():
+        states[post_id]["votes_count"] += delta  # not flushed yet
+    return ORJSONResponse({"items": [states[i] for i in ids if i in states]})
+
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.PostResponse)
-def vote(
+async def vote(
     vote: schemas.VoteCreate,
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_user),
 ):
-    # Load post + voted_by in ONE query
-    post = (
-        db.query(models.Post)
-        .options(joinedload(models.Post.voted_by))
-        .filter(models.Post.id == vote.post_id)
-        .first()
-    )
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-
-    already_voted = current_user in post.voted_by
-
+    # One statement decides the outcome; in VOTE_COUNTER=redis mode the
+    # post row is not touched here at all
+    in_redis = vote_counter.counter.enabled
     if vote.dir == 1:  # Upvote
-        if already_voted:
+        try:
+            changed = await votes.add_vote(db, current_user.id, vote.post_id, update_count=not in_redis)
+        except IntegrityError:
+            raise HTTPException(status_code=404, detail="Post not found")
+        if not changed:
             raise HTTPException(status_code=409, detail="Already voted")
-        post.voted_by.append(current_user)
     else:  # Remove vote
-        if not already_voted:
+        if not await votes.remove_vote(db, current_user.id, vote.post_id, update_count=not in_redis):
+            if await db.get(models.Post, vote.post_id) is None:
+                raise HTTPException(status_code=404, detail="Post not found")
             raise HTTPException(status_code=404, detail="Vote does not exist")
-        post.voted_by.remove(current_user)
 
-    db.commit()
-    db.refresh(post)
+    pending = 0
+    delta = 1 if vote.dir == 1 else -1
+    if in_redis:
+        try:
+            pending = await vote_counter.counter.apply(vote.post_id, delta)
+        except Exception as e:
+            logger.warning(f"Vote counter unavailable, counting in SQL: {e}")
+            await db.execute(votes.count_update([vote.post_id], delta))
+            await db.commit()
+            in_redis = False
+    if not in_redis:
+        await post_cache.invalidate([vote.post_id])  # votes_count changed
 
-    # Build response with correct fields
-    response = schemas.PostResponse.from_orm(post)
-    response.votes_count = len(post.voted_by)
-    response.is_voted = current_user in post.voted_by
-    return response
\ No newline at end of file
+    # Fresh votes_count and owner for the response, as one projected row
+    result = await db.execute(serializers.post_select().where(models.Post.id == vote.post_id))
+    body = serializers.post_dict(result.one(), is_voted=vote.dir == 1)
+    body["votes_count"] += pending
+    await hot_feed.voted(vote.post_id, body["votes_count"], delta)
+    return ORJSONResponse(body, status_code=status.HTTP_201_CREATED)
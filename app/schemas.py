@@ -3,6 +3,8 @@ from pydantic import BaseModel, validator
 from typing import Optional, Literal, List
 from datetime import datetime
 
+from .config import settings
+
 
 # --- Existing Schemas (unchanged, cleaned) ---
 class PostBase(BaseModel):
@@ -52,6 +54,25 @@ class PostResponse(PostBase):
         from_attributes = True
 
 
+class PostPage(BaseModel):
+    items: List[PostResponse]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
+
+
+class PostBatchRequest(BaseModel):
+    ids: List[int]
+
+    @validator("ids")
+    def ids_within_batch_limit(cls, v):
+        if not v or len(v) > settings.batch_max_ids:
+            raise ValueError(f"between 1 and {settings.batch_max_ids} ids allowed")
+        return v
+
+
+class PostBatch(BaseModel):
+    items: List[PostResponse]  # in request order; unknown ids are left out
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -73,6 +94,16 @@ class VoteCreate(BaseModel):
         return v
 
 
+class VoteState(BaseModel):
+    post_id: int
+    votes_count: int
+    is_voted: bool
+
+
+class VoteStates(BaseModel):
+    items: List[VoteState]  # in request order; unknown posts are left out
+
+
 # --- NEW: Comment Schemas ---
 class CommentBase(BaseModel):
     content: str
@@ -91,11 +122,18 @@ class CommentResponse(CommentBase):
     depth: int
     owner: UserResponse
     replies: List["CommentResponse"] = []  # Recursive replies
+    replies_count: int = 0  # direct replies, including ones not in `replies`
+    replies_cursor: Optional[str] = None  # set when replies were cut off
 
     class Config:
         from_attributes = True
 
 
+class CommentPage(BaseModel):
+    items: List[CommentResponse]
+    next_cursor: Optional[str] = None
+
+
 # --- NEW: Chat Message Schemas ---
 class ChatMessageCreate(BaseModel):
     content: str
@@ -115,5 +153,10 @@ class ChatMessageResponse(BaseModel):
         from_attributes = True
 
 
+class ChatHistoryPage(BaseModel):
+    items: List[ChatMessageResponse]  # newest first
+    next_cursor: Optional[str] = None  # pass back as ?before= for older messages
+
+
 # Enable forward reference for CommentResponse
 CommentResponse.update_forward_refs()
\ No newline at end of file
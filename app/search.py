@@ -0,0 +1,210 @@
+# app/search.py
+"""
+Post search.
+
+Query syntax (both backends):
+    hello world      -> posts containing both words
+    "hello world"    -> exact phrase
+    hel*             -> prefix match
+
+Backends return [(post_id, rank)] ordered by rank desc, id desc; the
+caller hydrates the posts. Pick one with SEARCH_BACKEND=postgres|memory.
+"""
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import REAL, cast, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_CLAUSE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class Clause(NamedTuple):
+    words: Tuple[str, ...]   # more than one word = phrase
+    prefix: bool             # last word is a prefix
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def parse_query(q: str) -> List[Clause]:
+    clauses = []
+    for phrase, word in _CLAUSE.findall(q):
+        raw = phrase or word
+        words = tuple(tokenize(raw))
+        if words:
+            clauses.append(Clause(words, raw.rstrip().endswith("*")))
+    return clauses
+
+
+# ---------- Postgres: tsvector column + GIN index ----------
+class PostgresSearchBackend:
+    """Uses posts.search_vector, a generated column kept current by Postgres."""
+
+    config = "english"
+
+    @staticmethod
+    def to_tsquery(clauses: List[Clause]) -> str:
+        parts = []
+        for clause in clauses:
+            words = list(clause.words)
+            if clause.prefix:
+                words[-1] += ":*"
+            parts.append("(" + " <-> ".join(words) + ")")
+        return " & ".join(parts)
+
+    async def search(self, db, q: str, limit: int, after: Optional[Tuple[float, int]] = None):
+        clauses = parse_query(q)
+        if not clauses:
+            return []
+        tsquery = func.to_tsquery(self.config, self.to_tsquery(clauses))
+        rank = func.ts_rank(models.Post.search_vector, tsquery)
+        stmt = (
+            select(models.Post.id, rank)
+            .where(models.Post.search_vector.op("@@")(tsquery))
+            .order_by(rank.desc(), models.Post.id.desc())
+            .limit(limit)
+        )
+        if after:
+            # ts_rank is float4; compare at that precision or the seek drifts
+            stmt = stmt.where(tuple_(rank, models.Post.id) < tuple_(cast(after[0], REAL), after[1]))
+        result = await db.execute(stmt)
+        return [(post_id, float(score)) for post_id, score in result.all()]
+
+    def index(self, post_id: int, title: str, content: str):
+        pass  # generated column
+
+    def remove(self, post_id: int):
+        pass  # row delete removes it
+
+    def warm(self, db: Session):
+        pass
+
+
+# ---------- In-process inverted index ----------
+class InMemorySearchBackend:
+    """
+    Positional inverted index kept in process memory.
+    For tests and single-worker development only: each worker holds its
+    own copy, loaded by warm() at startup and updated by that worker's
+    post routes, so it never sees posts written by other workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, List[int]]] = defaultdict(dict)
+        self._docs: Dict[int, List[str]] = {}
+        self._terms: Optional[List[str]] = None  # sorted, for prefix lookup
+
+    def index(self, post_id: int, title: str, content: str):
+        tokens = tokenize(f"{title} {content}")
+        with self._lock:
+            self._remove(post_id)
+            self._docs[post_id] = tokens
+            for pos, term in enumerate(tokens):
+                self._postings[term].setdefault(post_id, []).append(pos)
+            self._terms = None
+
+    def remove(self, post_id: int):
+        with self._lock:
+            self._remove(post_id)
+            self._terms = None
+
+    def _remove(self, post_id: int):
+        for term in set(self._docs.pop(post_id, ())):
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.pop(post_id, None)
+                if not docs:
+                    del self._postings[term]
+
+    def warm(self, db: Session):
+        rows = db.execute(select(models.Post.id, models.Post.title, models.Post.content))
+        for post_id, title, content in rows:
+            self.index(post_id, title, content)
+
+    def _expand(self, word: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [word] if word in self._postings else []
+        if self._terms is None:
+            self._terms = sorted(self._postings)
+        start = bisect.bisect_left(self._terms, word)
+        end = bisect.bisect_left(self._terms, word + "\uffff")
+        return self._terms[start:end]
+
+    def _positions(self, word: str, prefix: bool) -> Dict[int, Set[int]]:
+        merged: Dict[int, Set[int]] = {}
+        for term in self._expand(word, prefix):
+            for post_id, positions in self._postings[term].items():
+                merged.setdefault(post_id, set()).update(positions)
+        return merged
+
+    def _match(self, clause: Clause) -> Dict[int, int]:
+        """Return {post_id: occurrences} for one clause."""
+        last = len(clause.words) - 1
+        hits = None
+        for i, word in enumerate(clause.words):
+            positions = self._positions(word, clause.prefix and i == last)
+            if hits is None:
+                hits = positions
+            else:
+                # Keep phrase starts whose i-th word follows in sequence
+                hits = {
+                    pid: {p for p in starts if p + i in positions[pid]}
+                    for pid, starts in hits.items()
+                    if pid in positions
+                }
+            hits = {pid: starts for pid, starts in hits.items() if starts}
+            if not hits:
+                return {}
+        return {pid: len(starts) for pid, starts in hits.items()}
+
+    async def search(self, db, q: str, limit: int, after: Optional[Tuple[float, int]] = None):
+        clauses = parse_query(q)
+        if not clauses:
+            return []
+        with self._lock:
+            total = max(len(self._docs), 1)
+            scores: Optional[Dict[int, float]] = None
+            for clause in clauses:
+                matches = self._match(clause)
+                idf = math.log(1 + total / (1 + len(matches)))
+                clause_scores = {
+                    pid: idf * n / (1 + math.log(1 + len(self._docs[pid])))
+                    for pid, n in matches.items()
+                }
+                if scores is None:
+                    scores = clause_scores
+                else:
+                    scores = {pid: s + clause_scores[pid] for pid, s in scores.items() if pid in clause_scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(((pid, s) for pid, s in scores.items()), key=lambda r: (r[1], r[0]), reverse=True)
+        if after:
+            ranked = [r for r in ranked if (r[1], r[0]) < tuple(after)]
+        return ranked[:limit]
+
+
+_BACKENDS = {
+    "postgres": PostgresSearchBackend,
+    "memory": InMemorySearchBackend,
+}
+
+if settings.search_backend == "memory" and settings.web_concurrency > 1:
+    raise RuntimeError(
+        "SEARCH_BACKEND=memory keeps one index per worker and misses the others' "
+        "writes; use SEARCH_BACKEND=postgres with WEB_CONCURRENCY > 1"
+    )
+
+backend = _BACKENDS[settings.search_backend]()
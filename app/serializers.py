@@ -0,0 +1,75 @@
+# app/serializers.py
+"""
+Response dicts built straight from selected columns.
+
+The shapes match schemas.PostResponse and schemas.UserResponse, which
+still document the routes, but nothing here goes through pydantic: the
+rows are our own database output, and the dicts are handed to
+ORJSONResponse as they are.
+"""
+import time
+from typing import Any, Sequence
+
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+from sqlalchemy import select
+
+from . import metrics, models
+
+
+class ORJSONResponse(_ORJSONResponse):
+    """fastapi's ORJSONResponse, with render time counted in app.metrics."""
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            metrics.record_serialize(time.perf_counter() - start)
+
+USER_COLUMNS = (
+    models.User.email,
+    models.User.username,
+    models.User.phone_number,
+    models.User.id,
+    models.User.created_at,
+)
+
+POST_COLUMNS = (
+    models.Post.title,
+    models.Post.content,
+    models.Post.id,
+    models.Post.created_at,
+    models.Post.owner_id,
+    models.Post.votes_count,
+)
+
+
+def post_select():
+    """SELECT of POST_COLUMNS + USER_COLUMNS, owner joined in."""
+    return select(*POST_COLUMNS, *USER_COLUMNS).join(models.Post.owner)
+
+
+def user_dict(row: Sequence) -> dict:
+    email, username, phone_number, id, created_at = row
+    return {
+        "email": email,
+        "username": username,
+        "phone_number": phone_number,
+        "id": id,
+        "created_at": created_at,
+    }
+
+
+def post_dict(row: Sequence, is_voted: bool = False) -> dict:
+    """A post_select() row as a PostResponse-shaped dict."""
+    title, content, id, created_at, owner_id, votes_count = row[:6]
+    return {
+        "title": title,
+        "content": content,
+        "id": id,
+        "created_at": created_at,
+        "owner_id": owner_id,
+        "owner": user_dict(row[6:11]),
+        "votes_count": votes_count,
+        "is_voted": is_voted,
+    }
@@ -1,8 +1,26 @@
 # app/utils.py
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Coroutine, Optional, Set, Tuple
+
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
 
-# Centralised Argon2 hasher – used everywhere
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+logger = logging.getLogger("utils")
+
+# Centralised Argon2 hasher – used everywhere.
+# Raising the cost settings makes needs_update() flag old hashes, which
+# verify_and_update() rehashes on the user's next login.
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.argon2_time_cost,
+    argon2__memory_cost=settings.argon2_memory_cost,
+    argon2__parallelism=settings.argon2_parallelism,
+)
 
 
 def hash_password(password: str) -> str:
@@ -12,4 +30,83 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain: str, hashed: str) -> bool:
     """Verify a plain password against its hash."""
-    return pwd_context.verify(plain, hashed)
\ No newline at end of file
+    return pwd_context.verify(plain, hashed)
+
+
+def verify_and_update(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify, and if the hash was made with outdated cost settings return a
+    fresh one to store: (valid, new_hash or None). A module-level function
+    so the hash pool can pickle it.
+    """
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+# --- Hashing service: keeps Argon2 off the event loop and the threadpool ---
+class HashingBusy(Exception):
+    """More hashing work queued than HASH_MAX_PENDING allows."""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.hash_workers)
+    return _pool
+
+
+async def _run(fn, *args):
+    """
+    Run fn in the hash pool. Rejects instead of queueing without bound,
+    so a login spike sheds load rather than starving other endpoints.
+    """
+    global _pending
+    if _pending >= settings.hash_max_pending:
+        raise HashingBusy()
+    _pending += 1
+    try:
+        if settings.hash_workers <= 0:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_and_update_async(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return await _run(verify_and_update, plain, hashed)
+
+
+def shutdown_hash_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+# --- Fire-and-forget tasks ---
+_background: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """
+    asyncio.create_task() for work nobody awaits. The event loop only holds
+    tasks weakly, so keep a reference until the task is done, and log its
+    exception instead of losing it.
+    """
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
+def _background_done(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task {task.get_name()} failed: {task.exception()!r}")
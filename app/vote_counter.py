@@ -0,0 +1,130 @@
+# app/vote_counter.py
+"""
+Vote counts kept in Redis and flushed to Postgres (VOTE_COUNTER=redis).
+
+The votes table is still written synchronously; only posts.votes_count
+moves out of the vote's transaction, so concurrent votes on a hot post
+no longer queue on its row lock. Each vote adds +1/-1 to
+votes:delta:{post_id} and marks the post in votes:dirty (one MULTI). A
+task per worker pops dirty posts in batches, takes their deltas with
+GETDEL and applies them in a single UPDATE ... FROM (VALUES ...), then
+bumps their cache versions. posts.votes_count therefore lags by at most
+VOTE_FLUSH_INTERVAL_MS; pending() gives the not-yet-flushed part.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, column, update, values
+
+from . import models, post_cache, redis_client
+from .config import settings
+from .database import session_scope
+
+logger = logging.getLogger("vote_counter")
+
+DIRTY_KEY = "votes:dirty"
+
+
+def _delta_key(post_id: int) -> str:
+    return f"votes:delta:{post_id}"
+
+
+class VoteCounter:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.vote_counter == "redis" and redis_client.redis_client is not None
+
+    async def apply(self, post_id: int, delta: int) -> int:
+        """Record a committed vote change; returns the post's pending delta."""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+        pipe = redis_client.redis_client.pipeline(transaction=True)
+        pipe.incrby(_delta_key(post_id), delta)
+        pipe.sadd(DIRTY_KEY, post_id)
+        pending, _ = await pipe.execute()
+        return pending
+
+    async def pending(self, post_ids: Iterable[int]) -> Dict[int, int]:
+        """Deltas not yet flushed to posts.votes_count."""
+        post_ids = list(post_ids)
+        client = redis_client.redis_client
+        if not self.enabled or not post_ids:
+            return {}
+        raw = await client.mget([_delta_key(i) for i in post_ids])
+        return {i: int(v) for i, v in zip(post_ids, raw) if v}
+
+    async def _run(self):
+        interval = settings.vote_flush_interval_ms / 1000
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                while await self.flush() == settings.vote_flush_batch:
+                    pass  # backlog: keep draining
+            except Exception as e:
+                logger.error(f"Vote count flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Move one batch of pending deltas into Postgres; returns posts popped."""
+        client = redis_client.redis_client
+        if client is None:
+            return 0
+        post_ids: List[str] = await client.spop(DIRTY_KEY, settings.vote_flush_batch) or []
+        if not post_ids:
+            return 0
+        pipe = client.pipeline(transaction=False)
+        for post_id in post_ids:
+            pipe.getdel(_delta_key(int(post_id)))
+        deltas = [
+            (int(post_id), int(delta))
+            for post_id, delta in zip(post_ids, await pipe.execute())
+            if delta and int(delta)
+        ]
+        if deltas:
+            try:
+                await self._write(deltas)
+            except Exception:
+                # Put the deltas back so the next flush retries them
+                pipe = client.pipeline(transaction=True)
+                for post_id, delta in deltas:
+                    pipe.incrby(_delta_key(post_id), delta)
+                    pipe.sadd(DIRTY_KEY, post_id)
+                await pipe.execute()
+                raise
+            await post_cache.invalidate([post_id for post_id, _ in deltas])
+        return len(post_ids)
+
+    async def _write(self, deltas):
+        v = values(column("id", Integer), column("delta", Integer), name="v").data(deltas)
+        async with session_scope() as db:
+            await db.execute(
+                update(models.Post)
+                .where(models.Post.id == v.c.id)
+                .values(votes_count=models.Post.votes_count + v.c.delta, revision=models.Post.revision + 1)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def close(self):
+        """Stop the flush task after one last flush."""
+        if self._task is None or self._task.done():
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+        try:
+            while await self.flush():
+                pass
+        except Exception as e:
+            logger.error(f"Final vote count flush failed: {e}")
+
+
+counter = VoteCounter()
@@ -0,0 +1,133 @@
+# app/votes.py
+from typing import Iterable, Set
+
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def is_voted_expr(user_id: int, post_id):
+    """EXISTS on the (user_id, post_id) primary key — one index probe."""
+    return exists().where(
+        models.votes.c.user_id == user_id,
+        models.votes.c.post_id == post_id,
+    )
+
+
+def is_voted_stmt(user_id: int, post_id: int):
+    return select(is_voted_expr(user_id, post_id))
+
+
+def voted_post_ids_stmt(user_id: int, post_ids: Iterable[int]):
+    """Which of `post_ids` the user has voted on, in one query."""
+    return select(models.votes.c.post_id).where(
+        models.votes.c.user_id == user_id,
+        models.votes.c.post_id.in_(list(post_ids)),
+    )
+
+
+def vote_state_stmt(user_id: int, post_ids: Iterable[int]):
+    """(post_id, votes_count, is_voted) for each existing post, in one query."""
+    return (
+        select(
+            models.Post.id.label("post_id"),
+            models.Post.votes_count,
+            models.votes.c.user_id.isnot(None).label("is_voted"),
+        )
+        .outerjoin(
+            models.votes,
+            (models.votes.c.post_id == models.Post.id) & (models.votes.c.user_id == user_id),
+        )
+        .where(models.Post.id.in_(list(post_ids)))
+    )
+
+
+async def voted_post_ids(db: AsyncSession, user_id: int, post_ids: Iterable[int]) -> Set[int]:
+    post_ids = list(post_ids)
+    if not post_ids:
+        return set()
+    result = await db.execute(voted_post_ids_stmt(user_id, post_ids))
+    return set(result.scalars().all())
+
+
+def count_update(post_ids, delta):
+    """posts.votes_count += delta (and a new revision) for post_ids."""
+    return (
+        update(models.Post)
+        .where(models.Post.id.in_(list(post_ids)))
+        .values(votes_count=models.Post.votes_count + delta, revision=models.Post.revision + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def add_vote(db: AsyncSession, user_id: int, post_id: int, update_count: bool = True) -> bool:
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING: one statement decides
+    whether the vote is new (False if it already existed). With
+    update_count, posts.votes_count moves in the same transaction.
+    IntegrityError (no such post) is raised after rolling back.
+    """
+    try:
+        result = await db.execute(
+            pg_insert(models.votes)
+            .values(user_id=user_id, post_id=post_id)
+            .on_conflict_do_nothing()
+            .returning(models.votes.c.post_id)
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise
+    if result.first() is None:
+        await db.rollback()
+        return False
+    if update_count:
+        await db.execute(count_update([post_id], 1))
+    await db.commit()
+    return True
+
+
+async def remove_vote(db: AsyncSession, user_id: int, post_id: int, update_count: bool = True) -> bool:
+    """
+    DELETE ... RETURNING: False if there was no vote to remove. With
+    update_count, posts.votes_count moves in the same transaction.
+    """
+    result = await db.execute(
+        delete(models.votes)
+        .where(
+            models.votes.c.user_id == user_id,
+            models.votes.c.post_id == post_id,
+        )
+        .returning(models.votes.c.post_id)
+    )
+    if result.first() is None:
+        await db.rollback()
+        return False
+    if update_count:
+        await db.execute(count_update([post_id], -1))
+    await db.commit()
+    return True
+
+
+def reconcile_counts(db: Session) -> int:
+    """
+    Repair drift between posts.votes_count and the votes table.
+    Returns the number of posts corrected.
+    """
+    actual = (
+        select(func.count())
+        .select_from(models.votes)
+        .where(models.votes.c.post_id == models.Post.id)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(models.Post)
+        .where(models.Post.votes_count != actual)
+        .values(votes_count=actual, revision=models.Post.revision + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
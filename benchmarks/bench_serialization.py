@@ -0,0 +1,76 @@
+# benchmarks/bench_serialization.py
+"""
+Per-item cost of serializing a 100-post feed page.
+
+  before: PostResponse.from_orm per post, PostPage re-validated as the
+          response_model, jsonable_encoder + stdlib json (the old path)
+  after:  serializers.post_dict from row tuples + orjson (the current path)
+
+No database needed, but app.config still wants its environment
+(SECRET_KEY, DATABASE_URL, ...). Run from the repo root:
+
+  python -m benchmarks.bench_serialization
+"""
+import json
+import timeit
+from datetime import datetime
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from app import models, schemas, serializers
+
+PAGE_SIZE = 100
+ROUNDS = 200
+
+
+def make_rows():
+    now = datetime.utcnow()
+    return [
+        (f"title {i}", "content " * 40, i, now, i % 7, i * 3,
+         f"user{i % 7}@example.com", f"user{i % 7}", None, i % 7, now)
+        for i in range(PAGE_SIZE)
+    ]
+
+
+def make_orm(rows):
+    posts = []
+    for title, content, id, created_at, owner_id, votes_count, *user in rows:
+        email, username, phone_number, user_id, user_created = user
+        owner = models.User(id=user_id, email=email, username=username,
+                            phone_number=phone_number, created_at=user_created)
+        posts.append(models.Post(id=id, title=title, content=content, created_at=created_at,
+                                 owner_id=owner_id, votes_count=votes_count, owner=owner))
+    return posts
+
+
+def before(posts):
+    items = []
+    for post in posts:
+        response = schemas.PostResponse.from_orm(post)
+        response.is_voted = False
+        items.append(response)
+    page = schemas.PostPage(items=items, next_cursor=None)
+    validated = schemas.PostPage.model_validate(page.model_dump())  # response_model pass
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def after(rows):
+    return orjson.dumps({
+        "items": [serializers.post_dict(row) for row in rows],
+        "next_cursor": None,
+    })
+
+
+def main():
+    rows = make_rows()
+    posts = make_orm(rows)
+    assert json.loads(before(posts)) == json.loads(after(rows))
+
+    for name, fn, arg in (("before", before, posts), ("after", after, rows)):
+        best = min(timeit.repeat(lambda: fn(arg), number=ROUNDS, repeat=5)) / ROUNDS
+        print(f"{name:>6}: {best * 1e3:8.3f} ms/page  {best / PAGE_SIZE * 1e6:8.2f} us/post")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# tests/conftest.py
+"""
+Most tests need no services. Tests using the `db` fixture run against
+TEST_DATABASE_URL, a scratch Postgres database whose tables are dropped
+and recreated, and are skipped when it is not set:
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/app_test python -m pytest -q
+"""
+import os
+from contextlib import contextmanager
+
+# app.config reads the environment at import time
+for name in ("DATABASE_USERNAME", "DATABASE_PASSWORD", "DATABASE_HOST", "DATABASE_NAME", "SECRET_KEY"):
+    os.environ.setdefault(name, "test")
+# Never the app's own database; the placeholder is never connected to
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", "postgresql+psycopg2://localhost/unused")
+os.environ["SEARCH_BACKEND"] = "memory"
+os.environ["WEB_CONCURRENCY"] = "1"
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app import database, models
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    if not os.getenv("TEST_DATABASE_URL"):
+        pytest.skip("TEST_DATABASE_URL is not set")
+    try:
+        models.Base.metadata.drop_all(database.engine)
+    except OperationalError as e:
+        pytest.skip(f"TEST_DATABASE_URL is unreachable: {e}")
+    models.Base.metadata.create_all(database.engine)
+    yield database.engine
+    models.Base.metadata.drop_all(database.engine)
+
+
+@pytest.fixture
+def db(db_engine):
+    """A Session on empty tables."""
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        names = ", ".join(t.name for t in models.Base.metadata.sorted_tables)
+        with db_engine.begin() as conn:
+            conn.exec_driver_sql(f"TRUNCATE {names} RESTART IDENTITY CASCADE")
+
+
+@pytest.fixture
+def count_queries(db_engine):
+    """
+    Counts the statements run inside `with count_queries() as statements:`;
+    len(statements) afterwards.
+    """
+    @contextmanager
+    def counting():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db_engine, "before_cursor_execute", before_cursor_execute)
+
+    return counting
@@ -0,0 +1,78 @@
+# tests/test_chat_store.py
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import chat_store
+
+
+class FakeWriter(chat_store.ChatWriter):
+    """ChatWriter whose INSERT fails for the rows listed in `bad` (or transiently)."""
+
+    def __init__(self, bad=(), transient_failures=0):
+        super().__init__()
+        self.bad = set(bad)
+        self.transient_failures = transient_failures
+        self.inserts = []
+        self.written = []
+
+    async def _insert(self, rows):
+        self.inserts.append([row["id"] for row in rows])
+        if self.transient_failures:
+            self.transient_failures -= 1
+            raise OperationalError("INSERT", {}, Exception("connection reset"))
+        if any(row["id"] in self.bad for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        self.written.extend(row["id"] for row in rows)
+
+
+def flush(writer, ids):
+    async def run():
+        loop = asyncio.get_running_loop()
+        batch = [({"id": i}, loop.create_future()) for i in ids]
+        await writer._flush(batch)
+        return {row["id"]: done for row, done in batch}
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+
+    async def fake_sleep(seconds):
+        calls.append(seconds)
+
+    monkeypatch.setattr(chat_store.asyncio, "sleep", fake_sleep)
+    return calls
+
+
+def test_bad_row_is_bisected_out_without_retries(sleeps):
+    writer = FakeWriter(bad={5})
+    futures = flush(writer, range(16))
+
+    assert sorted(writer.written) == [i for i in range(16) if i != 5]
+    assert sleeps == []
+    # log2(16) levels down to the bad row, one INSERT per good half
+    assert len(writer.inserts) <= 2 * 4 + 1
+    assert isinstance(futures[5].exception(), IntegrityError)
+    assert all(futures[i].result() == i for i in range(16) if i != 5)
+
+
+def test_transient_errors_back_off_but_not_after_the_last_attempt(sleeps):
+    writer = FakeWriter(transient_failures=chat_store.MAX_ATTEMPTS)
+    futures = flush(writer, [1, 2])
+
+    assert len(writer.inserts) == chat_store.MAX_ATTEMPTS
+    assert len(sleeps) == chat_store.MAX_ATTEMPTS - 1
+    assert all(isinstance(f.exception(), OperationalError) for f in futures.values())
+
+
+def test_transient_error_then_success(sleeps):
+    writer = FakeWriter(transient_failures=1)
+    futures = flush(writer, [1, 2, 3])
+
+    assert writer.written == [1, 2, 3]
+    assert sleeps == [0.1]
+    assert [futures[i].result() for i in (1, 2, 3)] == [1, 2, 3]
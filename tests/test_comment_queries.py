@@ -0,0 +1,96 @@
+# tests/test_comment_queries.py
+"""
+Loading a comment thread costs a fixed number of statements, however deep
+or wide the thread is (app/comment_tree.py).
+"""
+import pytest
+
+from app import comment_tree, models
+
+
+def make_thread(db, depth: int, width: int) -> models.Post:
+    """A post whose comments form a full tree: `width` children per node, `depth` levels."""
+    user = models.User(email=f"u{depth}x{width}@example.com", username=f"u{depth}x{width}", password="x")
+    post = models.Post(title="t", content="c", owner=user)
+    db.add(post)
+    db.flush()
+
+    level = [None]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for _ in range(width):
+                comment = models.Comment(content="c", post_id=post.id, owner_id=user.id,
+                                         parent_id=parent.id if parent else None)
+                db.add(comment)
+                db.flush()
+                comment_tree.assign_path(comment, parent)
+                next_level.append(comment)
+        level = next_level
+    db.commit()
+    return post
+
+
+def count_nodes(nodes):
+    return sum(1 + count_nodes(n.replies) for n in nodes)
+
+
+SHAPES = [(1, 1), (2, 3), (4, 4), (6, 3)]
+
+
+def thread_page_statements(db, count_queries, depth, width):
+    post_id = make_thread(db, depth, width).id
+    db.expunge_all()  # nothing served from the identity map
+    with count_queries() as statements:
+        page, _ = comment_tree.load_page(
+            db, post_id, None, 0, limit=20, max_depth=10, replies_per_node=50
+        )
+    assert count_nodes(page) == sum(width ** d for d in range(1, depth + 1))
+    return len(statements)
+
+
+@pytest.mark.parametrize("depth,width", SHAPES)
+def test_thread_page_is_three_statements(db, count_queries, depth, width):
+    # sibling page + capped descendants + reply counts
+    assert thread_page_statements(db, count_queries, depth, width) == 3
+
+
+def test_replies_page_is_three_statements(db, count_queries):
+    post = make_thread(db, 4, 3)
+    parent = db.query(models.Comment).filter_by(post_id=post.id, depth=0).first()
+    with count_queries() as statements:
+        page, _ = comment_tree.load_page(
+            db, post.id, parent, 0, limit=20, max_depth=10, replies_per_node=50
+        )
+    assert count_nodes(page) == 3 + 9 + 27
+    assert len(statements) == 3
+
+
+@pytest.mark.parametrize("depth,width", SHAPES)
+def test_permalink_is_two_statements(db, count_queries, depth, width):
+    post = make_thread(db, depth, width)
+    leaf = (
+        db.query(models.Comment)
+        .filter_by(post_id=post.id, depth=depth - 1)
+        .first()
+    )
+    top = db.query(models.Comment).filter_by(post_id=post.id, depth=0).first()
+    for comment, context in ((leaf, depth - 1), (top, 0)):
+        with count_queries() as statements:
+            root = comment_tree.load_with_context(db, comment, context=context)
+        # the subtree (plus ancestor chain) query + reply counts
+        assert len(statements) == 2
+        assert root.id == top.id
+
+
+def test_permalink_caps_replies_per_node(db, count_queries):
+    post = make_thread(db, 4, 3)
+    top = db.query(models.Comment).filter_by(post_id=post.id, depth=0).first()
+    with count_queries() as statements:
+        root = comment_tree.load_with_context(db, top, max_depth=2, replies_per_node=2)
+    assert len(statements) == 2
+    assert count_nodes([root]) == 1 + 2 + 4
+    assert root.replies_count == 3
+    assert root.replies_cursor is not None
+    leaf = root.replies[0].replies[0]
+    assert leaf.replies == [] and leaf.replies_cursor is not None
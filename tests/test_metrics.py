@@ -0,0 +1,60 @@
+# tests/test_metrics.py
+import pytest
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.config import settings
+from app.main import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "s3cret")
+
+    async def boom():
+        raise RuntimeError("unhandled")
+
+    app.add_api_route("/test-boom", boom)
+    try:
+        yield TestClient(app, raise_server_exceptions=False)  # no lifespan: no DB or Redis
+    finally:
+        app.router.routes.pop()
+
+
+def scrape(client):
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    return response.text
+
+
+def test_metrics_needs_the_token(client, monkeypatch):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+    monkeypatch.setattr(settings, "metrics_token", "")
+    assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+def test_unhandled_exception_is_recorded_as_500(client):
+    assert client.get("/test-boom").status_code == 500
+    assert 'http_request_duration_seconds_count{method="GET",route="/test-boom",status="500"} 1' in scrape(client)
+
+
+def test_monotonic_values_are_counters(client):
+    text = scrape(client)
+    for name in ("app_cache_hits_total", "db_pool_checkouts_total",
+                 "db_pool_checkout_wait_seconds_total", "websocket_dropped_total"):
+        assert f"# TYPE {name} counter" in text
+    assert "# TYPE db_pool gauge" in text
+    assert 'stat="checkouts"' not in text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("h", "help", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(("/x",), 0.05)
+    histogram.observe(("/x",), 0.5)
+    histogram.observe(("/x",), 5.0)
+    lines = histogram.render()
+    assert 'h_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'h_bucket{route="/x",le="1.0"} 2' in lines
+    assert 'h_bucket{route="/x",le="+Inf"} 3' in lines
+    assert 'h_count{route="/x"} 3' in lines
@@ -0,0 +1,73 @@
+# tests/test_realtime.py
+import asyncio
+
+from app import inbox, realtime
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+
+def stream(n):
+    return f"1000-{n}"
+
+
+def test_replay_with_live_messages_arriving_during_the_read(monkeypatch):
+    """
+    Entries 1-4 are logged; while the replay reads them, 3 (a live copy)
+    and 5, 6 (new) are delivered. The client must see 1..6 once, in order.
+    """
+    conn = None
+
+    async def trimmed_past(user_id, last_id):
+        conn.offer("m6", stream(6))  # arrives before its predecessor
+        conn.offer("m5", stream(5))
+        return None
+
+    async def read_after(user_id, last_id):
+        yield [(stream(1), "m1"), (stream(2), "m2")]
+        conn.offer("m3", stream(3))
+        yield [(stream(3), "m3"), (stream(4), "m4")]
+
+    monkeypatch.setattr(inbox, "trimmed_past", trimmed_past)
+    monkeypatch.setattr(inbox, "read_after", read_after)
+
+    async def main():
+        nonlocal conn
+        ws = FakeWebSocket()
+        conn = realtime.Connection(realtime.ConnectionManager(), 1, ws)
+        await conn.replay(stream(0))
+        conn.offer("m2", stream(2))  # late live copy of a replayed entry
+        conn.offer("m7", stream(7))
+        await asyncio.sleep(0.01)
+        conn.stop()
+        return ws.sent
+
+    assert asyncio.run(main()) == ["m1", "m2", "m3", "m4", "m5", "m6", "m7"]
+
+
+def test_replay_truncated_notice_comes_first(monkeypatch):
+    async def trimmed_past(user_id, last_id):
+        return stream(2)
+
+    async def read_after(user_id, last_id):
+        yield [(stream(2), "m2")]
+
+    monkeypatch.setattr(inbox, "trimmed_past", trimmed_past)
+    monkeypatch.setattr(inbox, "read_after", read_after)
+
+    async def main():
+        ws = FakeWebSocket()
+        conn = realtime.Connection(realtime.ConnectionManager(), 1, ws)
+        await conn.replay(stream(0))
+        await asyncio.sleep(0.01)
+        conn.stop()
+        return ws.sent
+
+    sent = asyncio.run(main())
+    assert sent[0] == '{"replay_truncated": true, "oldest_id": "1000-2"}'
+    assert sent[1:] == ["m2"]
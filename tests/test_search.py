@@ -0,0 +1,96 @@
+# tests/test_search.py
+import asyncio
+
+import pytest
+
+from app.search import Clause, InMemorySearchBackend, PostgresSearchBackend, parse_query
+
+
+def search(backend, q, limit=10, after=None):
+    return asyncio.run(backend.search(None, q, limit, after=after))
+
+
+def ids(results):
+    return [post_id for post_id, _ in results]
+
+
+@pytest.fixture
+def backend():
+    backend = InMemorySearchBackend()
+    backend.index(1, "Hello world", "a greeting to the whole world")
+    backend.index(2, "World news", "hello again, hello everyone")
+    backend.index(3, "Helping hands", "volunteers help out")
+    backend.index(4, "Unrelated", "nothing to see")
+    return backend
+
+
+def test_parse_query_words_phrases_and_prefixes():
+    assert parse_query('Hello  "New York" hel*') == [
+        Clause(("hello",), False),
+        Clause(("new", "york"), False),
+        Clause(("hel",), True),
+    ]
+    assert parse_query('"ice cream*"') == [Clause(("ice", "cream"), True)]
+    assert parse_query('"" !! ') == []
+
+
+def test_postgres_tsquery_matches_parsed_clauses():
+    clauses = parse_query('"hello world" hel*')
+    assert PostgresSearchBackend.to_tsquery(clauses) == "(hello <-> world) & (hel:*)"
+
+
+def test_all_words_must_match(backend):
+    assert sorted(ids(search(backend, "hello world"))) == [1, 2]
+    assert ids(search(backend, "hello volunteers")) == []
+    assert ids(search(backend, "")) == []
+
+
+def test_phrase_needs_adjacent_words_in_order(backend):
+    assert ids(search(backend, '"hello world"')) == [1]
+    assert ids(search(backend, '"world hello"')) == []
+    assert ids(search(backend, '"hello again"')) == [2]
+
+
+def test_prefix_matches_every_completion(backend):
+    assert sorted(ids(search(backend, "hel*"))) == [1, 2, 3]
+    assert ids(search(backend, "help*")) == [3]
+    assert ids(search(backend, "hel")) == []  # without * it is a whole word
+
+
+def test_more_occurrences_rank_higher(backend):
+    results = search(backend, "hello")
+    assert ids(results) == [2, 1]  # 2 says hello twice
+    assert results[0][1] > results[1][1]
+
+
+def test_equal_ranks_break_ties_by_id_desc():
+    backend = InMemorySearchBackend()
+    for post_id in (5, 9, 7):
+        backend.index(post_id, "same", "text")
+    assert ids(search(backend, "same")) == [9, 7, 5]
+
+
+def test_cursor_pages_cover_all_results_once():
+    backend = InMemorySearchBackend()
+    for post_id in range(1, 8):
+        backend.index(post_id, "word " * (post_id % 3 + 1), "filler")
+    everything = search(backend, "word", limit=100)
+
+    pages, after = [], None
+    while True:
+        page = search(backend, "word", limit=3, after=after)
+        if not page:
+            break
+        pages.extend(page)
+        post_id, rank = page[-1]
+        after = (rank, post_id)
+    assert pages == everything
+    assert len(set(ids(pages))) == 7
+
+
+def test_reindex_and_remove(backend):
+    backend.index(4, "Hello", "now relevant")
+    assert 4 in ids(search(backend, "hello"))
+    backend.remove(1)
+    assert 1 not in ids(search(backend, "hel*"))
+    assert ids(search(backend, "greeting")) == []
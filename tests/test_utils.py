@@ -0,0 +1,87 @@
+# tests/test_utils.py
+import asyncio
+import gc
+import logging
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from app import utils
+
+
+def test_spawned_task_survives_gc_and_is_released_when_done():
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.01)
+        finished.append(True)
+
+    async def main():
+        utils.spawn(work())  # no reference kept here
+        gc.collect()
+        assert len(utils._background) == 1
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert finished == [True]
+    assert not utils._background
+
+
+def test_spawned_task_failure_is_logged(caplog):
+    async def boom():
+        raise ValueError("lost")
+
+    async def main():
+        utils.spawn(boom())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+    with caplog.at_level(logging.ERROR, logger="utils"):
+        asyncio.run(main())
+    assert "ValueError('lost')" in caplog.text
+    assert not utils._background
+
+
+def test_password_hashed_with_old_cost_settings_is_rehashed():
+    old_context = CryptContext(schemes=["argon2"], argon2__rounds=1,
+                               argon2__memory_cost=1024, argon2__parallelism=1)
+    old_hash = old_context.hash("pw")
+
+    assert utils.verify_and_update("nope", old_hash) == (False, None)
+    valid, new_hash = utils.verify_and_update("pw", old_hash)
+    assert valid and new_hash not in (None, old_hash)
+    assert utils.verify_and_update("pw", new_hash) == (True, None)
+
+
+def test_hash_workers_zero_uses_the_threadpool(monkeypatch):
+    monkeypatch.setattr(utils.settings, "hash_workers", 0)
+    monkeypatch.setattr(utils, "_get_pool", lambda: pytest.fail("process pool used"))
+
+    async def main():
+        loop_thread = threading.get_ident()
+        worker_thread = await utils._run(threading.get_ident)
+        hashed = await utils.hash_password_async("pw")
+        return loop_thread, worker_thread, hashed
+
+    loop_thread, worker_thread, hashed = asyncio.run(main())
+    assert worker_thread != loop_thread
+    assert utils.verify_password("pw", hashed)
+
+
+def test_hashing_rejects_work_beyond_max_pending(monkeypatch):
+    monkeypatch.setattr(utils.settings, "hash_workers", 0)
+    monkeypatch.setattr(utils.settings, "hash_max_pending", 2)
+    release = threading.Event()
+
+    async def main():
+        running = [asyncio.create_task(utils._run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert utils._pending == 2
+        with pytest.raises(utils.HashingBusy):
+            await utils._run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+
+    asyncio.run(main())
+    assert utils._pending == 0